@@ -0,0 +1,34 @@
+"""add chat_id to messages primary key
+
+Revision ID: 00114a4dcf8f
+Revises: b71e4d0c9a35
+Create Date: 2026-10-18 21:12:40.518236
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '00114a4dcf8f'
+down_revision: Union[str, None] = 'b71e4d0c9a35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # message_id уникален только внутри чата: без chat_id лид из другого чата молча пропускался
+    op.drop_constraint('messages_pkey', 'messages', type_='primary')
+    op.create_primary_key('messages_pkey', 'messages', ['id', 'chat_id', 'phone'])
+
+
+def downgrade() -> None:
+    # Старый ключ не допускает одинаковых (id, phone) в разных чатах - оставляем одну строку
+    op.execute(
+        'DELETE FROM messages a USING messages b '
+        'WHERE a.id = b.id AND a.phone = b.phone AND a.chat_id > b.chat_id'
+    )
+    op.drop_constraint('messages_pkey', 'messages', type_='primary')
+    op.create_primary_key('messages_pkey', 'messages', ['id', 'phone'])
@@ -12,6 +12,16 @@ class ConfigDataBase(BaseSettings):
     POSTGRES_DB: str
     DB_ECHO_LOG: bool = False
 
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 3600
+    DB_POOL_PRE_PING: bool = False
+    # Кэш подготовленных запросов asyncpg, 0 - выключен (нужно для pgbouncer в transaction mode)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Одна сессия и транзакция на апдейт бота вместо сессии на каждый запрос репозитория
+    DB_UNIT_OF_WORK: bool = False
+
     @property
     def database_url(self) -> Optional[PostgresDsn]:
         return (
@@ -1,19 +1,97 @@
 from asyncio import current_task
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Dict
 
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     create_async_engine,
     async_sessionmaker,
     async_scoped_session
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from .db_config import settings_db
+from .db_config import settings_db, ConfigDataBase
+
+unit_of_work_session: ContextVar[AsyncSession | None] = ContextVar('unit_of_work_session', default=None)
+
+
+class UnitOfWorkSession(AsyncSession):
+    """
+    Сессия на весь апдейт: пока info['unit_of_work'] установлен,
+    commit() из репозиториев только отправляет изменения в БД,
+    а транзакцию фиксирует DatabaseHelper.unit_of_work().
+    Колбэки из info['after_commit'] вызываются только после этой фиксации.
+    """
+
+    async def commit(self) -> None:
+        if self.info.get('unit_of_work'):
+            await self.flush()
+        else:
+            await super().commit()
+
+    def _run_after_commit(self) -> None:
+        for callback in self.info.pop('after_commit', []):
+            callback()
+
+    async def checkpoint(self) -> None:
+        """
+        Фиксирует накопленные изменения, не завершая unit of work.
+        Вызывается перед запросами к Bot API, чтобы транзакция и соединение
+        не удерживались на время медленных внешних вызовов.
+        """
+        if not self.info.get('unit_of_work'):
+            return
+        if self.in_transaction():
+            self.info['unit_of_work'] = False
+            try:
+                await super().commit()
+            finally:
+                self.info['unit_of_work'] = True
+        self._run_after_commit()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, считающий ожидания свободного соединения и таймауты"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waits = 0
+        self.timeouts = 0
+
+    def _do_get(self):
+        if self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow:
+            self.waits += 1
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.waits, pool.timeouts = self.waits, self.timeouts
+        return pool
 
 
 class DatabaseHelper:
-    def __init__(self, url: str, echo: bool = False):
-        self.engine = create_async_engine(url=url, echo=echo, pool_recycle=3600)
+    def __init__(self, url: str, config: ConfigDataBase):
+        url = make_url(url).update_query_dict(
+            {"prepared_statement_cache_size": str(config.DB_STATEMENT_CACHE_SIZE)}
+        )
+        self.engine = create_async_engine(
+            url=url,
+            echo=config.DB_ECHO_LOG,
+            poolclass=InstrumentedQueuePool,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=config.DB_POOL_PRE_PING,
+            connect_args={"statement_cache_size": config.DB_STATEMENT_CACHE_SIZE},
+        )
 
         self.session_factory = async_sessionmaker(
             bind=self.engine,
@@ -21,6 +99,13 @@ class DatabaseHelper:
             autocommit=False,
             expire_on_commit=False
         )
+        self.unit_of_work_factory = async_sessionmaker(
+            bind=self.engine,
+            class_=UnitOfWorkSession,
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False
+        )
 
     def get_scope_session(self):
         return async_scoped_session(
@@ -30,7 +115,10 @@ class DatabaseHelper:
 
     @asynccontextmanager
     async def get_db_session(self):
-        from sqlalchemy import exc
+        shared = unit_of_work_session.get()
+        if shared is not None and shared.info.get('unit_of_work'):
+            yield shared
+            return
 
         session: AsyncSession = self.session_factory()
         try:
@@ -41,5 +129,53 @@ class DatabaseHelper:
         finally:
             await session.close()
 
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """
+        Вызывает callback (сброс кэшей) после фиксации изменений: внутри unit of work -
+        после фиксации его транзакции, иначе сразу. Иначе параллельный запрос
+        успел бы закэшировать еще не зафиксированное состояние под новой версией.
+        """
+        shared = unit_of_work_session.get()
+        if shared is not None and shared.info.get('unit_of_work'):
+            shared.info.setdefault('after_commit', []).append(callback)
+        else:
+            callback()
+
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator[UnitOfWorkSession]:
+        """
+        Открывает сессию, которую get_db_session отдает всем репозиториям в текущем контексте.
+        Транзакция фиксируется при выходе (и в checkpoint) и откатывается при исключении.
+        """
+        session: UnitOfWorkSession = self.unit_of_work_factory()
+        session.info['unit_of_work'] = True
+        token = unit_of_work_session.set(session)
+        try:
+            yield session
+            session.info['unit_of_work'] = False
+            await session.commit()
+        except BaseException:
+            session.info.pop('after_commit', None)
+            await session.rollback()
+            raise
+        else:
+            session._run_after_commit()
+        finally:
+            # Задачи, унаследовавшие контекст, после выхода получают собственные сессии
+            session.info['unit_of_work'] = False
+            unit_of_work_session.reset(token)
+            await session.close()
+
+    def pool_snapshot(self) -> Dict[str, int]:
+        pool: InstrumentedQueuePool = self.engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "waits": pool.waits,
+            "timeouts": pool.timeouts,
+        }
+
 
-db_helper = DatabaseHelper(settings_db.database_url, settings_db.DB_ECHO_LOG)
+db_helper = DatabaseHelper(settings_db.database_url, settings_db)
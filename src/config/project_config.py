@@ -1,5 +1,7 @@
-from dotenv import load_dotenv
+import socket
 
+from dotenv import load_dotenv
+from pydantic import Field
 from pydantic_settings import BaseSettings
 
 load_dotenv()
@@ -14,10 +16,51 @@ class Settings(BaseSettings):
     SERVICE_TOKEN: str
     WEB_APP_URL: str
     REDIS_URL: str
+
+    BOT_MODE: str = 'polling'
+    WEBHOOK_URL: str = ''
+    WEBHOOK_SECRET: str = ''
+
+    CLUSTER_ENABLED: bool = False
+    CLUSTER_PARTITIONS: int = 16
+    CLUSTER_LEASE_TTL: float = 15
+    REPLICA_ID: str = Field(default_factory=socket.gethostname)
+
     S3_ACCESS_KEY_ID: str
     S3_SECRET_ACCESS_KEY: str
     S3_BUCKET_NAME: str
     S3_ENDPOINT_URL: str
+    S3_MEMORY_LIMIT: int = 20 * 1024 * 1024
+    S3_CONCURRENCY: int = 8
+    FILE_ID_CACHE_TTL: int = 60 * 60
+
+    BROADCAST_WORKERS: int = 8
+    BROADCAST_RATE: float = 25
+    BROADCAST_CHAT_RATE: float = 20 / 60
+
+    ALBUM_BACKEND: str = 'memory'
+
+    LEAD_QUEUE_ENABLED: bool = False
+    LEAD_WORKERS: int = 4
+    LEAD_MAX_ATTEMPTS: int = 3
+    LEAD_RETRY_DELAY: float = 5
+
+    MEMBERSHIP_CACHE_TTL: float = 300
+    MEMBERSHIP_CACHE_NEGATIVE_TTL: float = 30
+    MEMBERSHIP_CACHE_MAX_SIZE: int = 10000
+
+    CHAT_DIRECTORY_TTL: float = 300
+
+    CHAT_EXIST_CACHE_TTL: float = 600
+    CHAT_EXIST_CACHE_NEGATIVE_TTL: float = 60
+
+    # Проверка всех чатов раз в CHAT_SWEEP_INTERVAL секунд, 0 - выключена
+    CHAT_SWEEP_INTERVAL: float = 6 * 60 * 60
+    CHAT_SWEEP_WORKERS: int = 4
+    CHAT_SWEEP_RATE: float = 10
+
+    LOG_LEVEL: str = 'INFO'
+    LOG_ACCESS_SAMPLE_RATE: float = 1.0
 
 
 settings = Settings() # type: ignore
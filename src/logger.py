@@ -0,0 +1,69 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict
+
+from src.config.project_config import settings
+
+# Контекст текущего апдейта: update_id, user_id, handler, ...
+# Словарь изменяемый, чтобы внутренние middleware могли дописать в него данные
+update_context: ContextVar[Dict[str, Any] | None] = ContextVar('update_context', default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **getattr(record, 'context', {}),
+            **getattr(record, 'fields', {}),
+        }
+        if record.exc_text:
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Кладет запись в очередь, не форматируя ее в event loop.
+    Контекст апдейта и traceback снимаются здесь, т.к. пишет запись другой поток.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.context = dict(update_context.get() or {})
+        return record
+
+
+def setup_logging() -> QueueListener:
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [ContextQueueHandler(log_queue)]
+    root.setLevel(settings.LOG_LEVEL)
+    # aiogram пишет строку на каждый апдейт, access log ведет LogMiddleware с семплированием
+    logging.getLogger('aiogram.event').setLevel(logging.WARNING)
+    return listener
+
+
+logger = logging.getLogger('bot')
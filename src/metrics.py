@@ -0,0 +1,139 @@
+import time
+from collections import Counter as Tally
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from prometheus_client import Counter, Gauge, Histogram
+from redis.asyncio import Redis
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+HANDLER_DURATION = Histogram(
+    'bot_handler_duration_seconds', 'Время обработки апдейта хендлером', ['bot', 'router', 'handler'],
+)
+HANDLER_ERRORS = Counter(
+    'bot_handler_errors_total', 'Исключения в хендлерах', ['bot', 'router', 'handler'],
+)
+HANDLERS_IN_FLIGHT = Gauge(
+    'bot_handlers_in_flight', 'Апдейты, обрабатываемые прямо сейчас', ['bot'],
+)
+FSM_STATES = Gauge(
+    'bot_fsm_states', 'Пользователи в каждом состоянии FSM', ['bot_id', 'state'],
+)
+
+TELEGRAM_REQUEST_DURATION = Histogram(
+    'telegram_request_duration_seconds', 'Время запроса к Telegram Bot API', ['bot', 'method'],
+)
+TELEGRAM_REQUEST_ERRORS = Counter(
+    'telegram_request_errors_total', 'Ошибки запросов к Telegram Bot API', ['bot', 'method', 'error'],
+)
+
+DB_QUERY_DURATION = Histogram(
+    'db_query_duration_seconds', 'Время выполнения SQL запроса', ['operation'],
+)
+DB_QUERY_ERRORS = Counter(
+    'db_query_errors_total', 'Ошибки SQL запросов', ['operation'],
+)
+DB_POOL = Gauge(
+    'db_pool', 'Состояние пула соединений с БД (waits и timeouts - с момента запуска)', ['stat'],
+)
+
+REDIS_COMMAND_DURATION = Histogram(
+    'redis_command_duration_seconds', 'Время выполнения команды Redis', ['command'],
+)
+
+S3_REQUEST_DURATION = Histogram(
+    's3_request_duration_seconds', 'Время запроса к S3', ['operation'],
+)
+S3_REQUEST_ERRORS = Counter(
+    's3_request_errors_total', 'Ошибки запросов к S3', ['operation'],
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Время обработки HTTP запроса', ['method', 'route', 'status'],
+)
+
+
+@contextmanager
+def observe(histogram: Histogram, errors: Counter | None = None, **labels) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if errors is not None:
+            errors.labels(**labels).inc()
+        raise
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Замеряет SQL запросы через события движка; старт запроса хранится в conn.info"""
+
+    def operation(statement: str) -> str:
+        return statement.lstrip().split(' ', 1)[0].upper()
+
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        DB_QUERY_DURATION.labels(operation(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine.sync_engine, 'handle_error')
+    def handle_error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get('query_started'):
+            conn.info['query_started'].pop()
+        DB_QUERY_ERRORS.labels(operation(context.statement or '')).inc()
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: latency и ошибки каждого метода Bot API"""
+
+    def __init__(self, bot_name: str):
+        self.bot_name = bot_name
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        api_method = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            TELEGRAM_REQUEST_ERRORS.labels(self.bot_name, api_method, type(e).__name__).inc()
+            raise
+        finally:
+            TELEGRAM_REQUEST_DURATION.labels(self.bot_name, api_method).observe(time.perf_counter() - started)
+
+
+def collect_pool_stats(snapshot: Dict[str, int]) -> None:
+    for stat, value in snapshot.items():
+        DB_POOL.labels(stat).set(value)
+
+
+async def collect_fsm_states(redis: Redis, prefix: str = 'fsm') -> None:
+    """Пересчитывает FSM_STATES по ключам RedisStorage (<prefix>:<bot_id>:...:state)"""
+    tally: Tally = Tally()
+    keys = []
+    async for key in redis.scan_iter(match=f'{prefix}:*:state', count=1000):
+        keys.append(key)
+    for i in range(0, len(keys), 1000):
+        batch = keys[i:i + 1000]
+        for key, state in zip(batch, await redis.mget(batch)):
+            if state:
+                tally[(key.decode().split(':')[1], state.decode())] += 1
+
+    FSM_STATES.clear()
+    for (bot_id, state), count in tally.items():
+        FSM_STATES.labels(bot_id, state).set(count)
@@ -0,0 +1,15 @@
+from redis.asyncio import Redis
+
+from src.config.project_config import settings
+from src.metrics import REDIS_COMMAND_DURATION, observe
+
+
+class InstrumentedRedis(Redis):
+    """Redis клиент, замеряющий время каждой команды"""
+
+    async def execute_command(self, *args, **options):
+        with observe(REDIS_COMMAND_DURATION, command=str(args[0]).upper()):
+            return await super().execute_command(*args, **options)
+
+
+redis = InstrumentedRedis.from_url(settings.REDIS_URL)
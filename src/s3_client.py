@@ -1,72 +1,143 @@
+import asyncio
 import base64
 import os
-import tempfile
-from dataclasses import dataclass
-from typing import List
+from contextlib import AsyncExitStack
+from typing import AsyncGenerator, List
 
-import aiofiles
+from aiobotocore.config import AioConfig
 from aiobotocore.session import get_session
+from aiogram import Bot
+from aiogram.types import BufferedInputFile, InputFile
 
 from src.config.project_config import settings
+from src.metrics import S3_REQUEST_DURATION, S3_REQUEST_ERRORS, observe
+
+
+class S3InputFile(InputFile):
+    """
+    Файл из S3, при загрузке в Telegram читается потоком из Body.
+    Первая загрузка читает Body ответа, уже полученного в get_input_files,
+    повторные (ретрай отправки) запрашивают объект заново.
+    """
+
+    def __init__(self, s3: "S3Client", key: str, filename: str, body=None, chunk_size: int = 1024 * 1024):
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.s3 = s3
+        self.key = key
+        self._body = body
+
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        body, self._body = self._body, None
+        if body is None:
+            client = await self.s3.get_client()
+            with observe(S3_REQUEST_DURATION, S3_REQUEST_ERRORS, operation='get_object'):
+                response = await client.get_object(
+                    Bucket=self.s3.bucket_name,
+                    Key=self.key,
+                )
+            body = response["Body"]
+        try:
+            while chunk := await body.read(self.chunk_size):
+                yield chunk
+        finally:
+            body.close()
 
 
-@dataclass
-class TempFile:
-    path: str
-    real_name: str
-
 class S3Client:
-    def __init__(self, access_key, secret_key, endpoint_url, bucket_name):
+    def __init__(self, access_key, secret_key, endpoint_url, bucket_name, memory_limit: int = 0,
+                 concurrency: int = 8):
         self.config = {
             "aws_access_key_id": access_key,
             "aws_secret_access_key": secret_key,
             "endpoint_url": endpoint_url,
         }
         self.bucket_name = bucket_name
+        self.memory_limit = memory_limit
+        self.concurrency = concurrency
         self.session = get_session()
-
-    async def download_files(self, file_keys: List[str]) -> List[TempFile]:
-        """Скачивает файлы и возвращает список временных путей"""
-        result = []
-
-        async with self.session.create_client("s3", **self.config) as client:
-            for key in file_keys:
+        self._client = None
+        self._exit_stack: AsyncExitStack | None = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """Открывает долгоживущий клиент с пулом соединений"""
+        async with self._lock:
+            if self._client is not None:
+                return
+            self._exit_stack = AsyncExitStack()
+            self._client = await self._exit_stack.enter_async_context(self.session.create_client(
+                "s3",
+                config=AioConfig(max_pool_connections=self.concurrency),
+                **self.config,
+            ))
+
+    async def close(self):
+        async with self._lock:
+            if self._exit_stack is not None:
+                await self._exit_stack.aclose()
+            self._client = None
+            self._exit_stack = None
+
+    async def get_client(self):
+        if self._client is None:
+            await self.start()
+        return self._client
+
+    @staticmethod
+    def _real_name(key: str, metadata: dict) -> str:
+        real_name = metadata.get("name")
+        if not real_name:
+            return os.path.basename(key)
+        return base64.b64decode(real_name).decode('utf-8')
+
+    async def _get_input_file(self, client, semaphore: asyncio.Semaphore, key: str, streams: List[int]) -> InputFile:
+        async with semaphore:
+            with observe(S3_REQUEST_DURATION, S3_REQUEST_ERRORS, operation='get_object'):
                 response = await client.get_object(
                     Bucket=self.bucket_name,
                     Key=key,
                 )
 
-                body = response["Body"]
-                metadata = response.get("Metadata", {})
-                real_name = metadata.get("name")
-
-                if not real_name:
-                    real_name = os.path.basename(key)
-
-                suffix = os.path.splitext(real_name)[1]
-
-                with tempfile.NamedTemporaryFile(
-                    delete=False,
-                    suffix=suffix
-                ) as tmp:
-                    tmp_path = tmp.name
-
-                async with aiofiles.open(tmp_path, "wb") as f:
-                    while chunk := await body.read(1024 * 1024):
-                        await f.write(chunk)
-
-                body.close()
-                result.append(TempFile(path=tmp_path, real_name=base64.b64decode(real_name).decode('utf-8')))
-
-        return result
-
+            body = response["Body"]
+            real_name = self._real_name(key, response.get("Metadata", {}))
+
+            if response.get("ContentLength", 0) <= self.memory_limit:
+                try:
+                    return BufferedInputFile(await body.read(), filename=real_name)
+                finally:
+                    body.close()
+
+            # Непрочитанный Body держит соединение пула до отправки файла:
+            # оставляем открытыми не больше streams[0], остальные объекты запросятся заново при загрузке
+            if streams[0] > 0:
+                streams[0] -= 1
+                return S3InputFile(self, key, filename=real_name, body=body)
+            body.close()
+            return S3InputFile(self, key, filename=real_name)
+
+    async def get_input_files(self, file_keys: List[str]) -> List[InputFile]:
+        """
+        Возвращает файлы для отправки в Telegram без записи на диск:
+        объекты до memory_limit байт читаются в память, остальные
+        передаются потоком из S3 при загрузке. Объекты запрашиваются
+        параллельно, не более concurrency одновременно.
+        """
+        client = await self.get_client()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        streams = [max(self.concurrency - 1, 0)]
+        return list(await asyncio.gather(*(self._get_input_file(client, semaphore, key, streams)
+                                           for key in file_keys)))
 
     async def delete_files(self, file_keys: List[str]):
-        async with self.session.create_client("s3", **self.config) as client:
-            for key in file_keys:
-                await client.delete_object(
+        client = await self.get_client()
+        for i in range(0, len(file_keys), 1000):
+            with observe(S3_REQUEST_DURATION, S3_REQUEST_ERRORS, operation='delete_objects'):
+                await client.delete_objects(
                     Bucket=self.bucket_name,
-                    Key=key,
+                    Delete={
+                        "Objects": [{"Key": key} for key in file_keys[i:i + 1000]],
+                        "Quiet": True,
+                    },
                 )
 
 
@@ -75,4 +146,6 @@ s3client = S3Client(
     secret_key=settings.S3_SECRET_ACCESS_KEY,
     endpoint_url=settings.S3_ENDPOINT_URL,
     bucket_name=settings.S3_BUCKET_NAME,
+    memory_limit=settings.S3_MEMORY_LIMIT,
+    concurrency=settings.S3_CONCURRENCY,
 )
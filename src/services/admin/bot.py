@@ -4,6 +4,7 @@ from .handlers import admin
 from .middlewares.permission_middleware import PermissionMiddleware
 from .services.admin_service import admin_service
 from src.config.project_config import settings
+from src.logger import logger
 
 
 async def set_commands(bot):
@@ -20,7 +21,7 @@ async def check_admin_list():
 async def on_startup(bot):
     await check_admin_list()
     await set_commands(bot)
-    print('Админ вышел в онлайн')
+    logger.info('Админ вышел в онлайн')
 
 
 class AdminBot:
@@ -37,8 +38,11 @@ class AdminBot:
     async def start_bot(self, dp: Dispatcher):
         self.register_dispatcher(dp)
         await check_admin_list()
-        await self.bot.delete_webhook(drop_pending_updates=True)
-        print("admin -", await self.bot.get_me())
+        # В режиме webhook вебхук ставит start_bots_webhook, удалять его нельзя:
+        # это сбросит накопившиеся апдейты и отключит вебхук для остальных реплик
+        if settings.BOT_MODE != 'webhook':
+            await self.bot.delete_webhook(drop_pending_updates=True)
+        logger.info("admin - %s", await self.bot.get_me())
 
 
 admin_bot = AdminBot()
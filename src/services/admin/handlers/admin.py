@@ -1,8 +1,8 @@
-import re
+from contextlib import suppress
 from typing import Optional, List
 
-from aiogram import Router, F
-from aiogram.exceptions import TelegramMigrateToChat, TelegramForbiddenError, TelegramBadRequest
+from aiogram import Bot, Router, F
+from aiogram.exceptions import TelegramMigrateToChat, TelegramForbiddenError, TelegramBadRequest, TelegramRetryAfter
 from aiogram.exceptions import TelegramNotFound
 from aiogram.filters import Command, BaseFilter
 from aiogram.fsm.context import FSMContext
@@ -10,18 +10,24 @@ from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import Message, CallbackQuery, InputMediaPhoto, InputMediaDocument, InputMediaVideo, InputMediaAudio, \
     InputMediaAnimation
 from aiogram.utils.deep_linking import create_deep_link
-from sqlalchemy.exc import IntegrityError
 
 from src.config.project_config import settings
+from src.logger import logger
 from src.services.operator_helper.bot import operator_bot
-from src.use_cases.chat_keyboard_use_case import get_chat_keyboards
+from src.use_cases.broadcast_job_use_case import BroadcastJob, broadcast_queue
+from src.use_cases.broadcast_use_case import Broadcaster
+from src.use_cases.chat_health_use_case import ChatHealthReport
+from src.use_cases.chat_keyboard_use_case import chat_directory
+from src.use_cases.membership_cache_use_case import chat_exist_cache, invalidate_chat_on_error
+from src.use_cases.phone_use_case import extract_phone_keys
 from ..filters.chat_type import ChatTypeFilter
-from ..keyboards.admin_kb import create_admin_choosing, create_menu, back_button, deleting_messages_kb
-from ..schemas.chat_schema import ChatBase, ChatCreate
+from ..keyboards.admin_kb import create_menu, back_button, search_results_kb, operator_pages, chat_pages, \
+    message_chat_pages, message_pages
+from ..schemas.chat_schema import ChatBase
 from ..schemas.message_schema import MessageBase
 from ..services.admin_service import admin_service
 from ..services.chat_service import chat_service
-from ..services.message_service import message_service
+from ..services.message_service import message_service, MIN_SEARCH_LENGTH
 from ..services.operator_service import operator_service
 
 router = Router()
@@ -47,16 +53,18 @@ class MessageDeleting(StatesGroup):
     choosing_number = State()
 
 
-def chunks(lst, chunk_size):
-    for i in range(0, len(lst), chunk_size):
-        yield lst[i:i + chunk_size]
+class MessageSearch(StatesGroup):
+    write_query = State()
+
+
+SEARCH_PAGE_SIZE = 10
 
 
 async def fix_deleting_message(target_message: MessageBase):
     if target_message:
         try:
             await operator_bot.bot.delete_message(target_message.chat_id, target_message.id)
-            await message_service.delete(pk=target_message.id)
+            await message_service.delete_many([target_message.id], chat_id=target_message.chat_id)
         except (TelegramNotFound, TelegramBadRequest):
             return 'Сообщение уже удалено'
         else:
@@ -70,24 +78,26 @@ def except_when_send(send_function):
         try:
             await send_function(chat, *args, **kwargs)
         except TelegramMigrateToChat as e:
-            await chat_service.delete(chat.id)
-            try:
-                await chat_service.create(ChatCreate(id=str(e.migrate_to_chat_id), name=chat.name))
-            except IntegrityError:
-                print('Supergroup already exists', chat.id)
+            await chat_service.migrate(chat.id, str(e.migrate_to_chat_id), chat.name)
+            chat_exist_cache.invalidate(chat.id)
 
             try:
                 chat.id = str(e.migrate_to_chat_id)
                 await send_function(chat, *args, **kwargs)
+            except TelegramRetryAfter:
+                raise
             except Exception as e:
-                print('Error:', chat.id, chat.name)
-                print(f'Send to chat error: {e}')
+                logger.warning('Send to chat error: %s %s: %s', chat.id, chat.name, e)
+                invalidate_chat_on_error(chat.id, e)
                 return chat
-        
+
+        except TelegramRetryAfter:
+            raise
         except Exception as e:
-            print('Error:', chat.id, chat.name)
-            print(f'Send to chat error: {e}')
+            logger.warning('Send to chat error: %s %s: %s', chat.id, chat.name, e)
+            invalidate_chat_on_error(chat.id, e)
             return chat
+        chat_exist_cache.set(chat.id, True)
     return wrapper
 
 
@@ -101,6 +111,68 @@ async def fix_send_message(chat: ChatBase, message):
     await operator_bot.bot.send_message(chat.id, message)
 
 
+MEDIA_TYPES = {
+    'photo': InputMediaPhoto,
+    'document': InputMediaDocument,
+    'video': InputMediaVideo,
+    'audio': InputMediaAudio,
+    'animation': InputMediaAnimation,
+}
+
+
+async def run_broadcast_job(job: BroadcastJob, bot: Bot):
+    processed = await broadcast_queue.processed(job)
+
+    if job.media:
+        media_group = [MEDIA_TYPES[i['type']](media=i['media'], caption=i['caption']) for i in job.media]
+
+        async def send_function(chat: ChatBase) -> ChatBase | None:
+            return await fix_send_media_group(chat, media_group)
+    else:
+        async def send_function(chat: ChatBase) -> ChatBase | None:
+            return await fix_send_message(chat, job.text)
+
+    async def send_and_mark(chat: ChatBase) -> ChatBase | None:
+        chat_id = chat.id
+        error_chat = await send_function(chat)
+        try:
+            await broadcast_queue.mark(job, chat_id, 'sent' if error_chat is None else 'failed')
+        except Exception as e:
+            # Сообщение уже ушло (или не ушло) - результат отправки важнее записи статуса
+            logger.warning('Broadcast mark error: %s %s: %s', job.id, chat_id, e)
+        return error_chat
+
+    # Альбом из N файлов Telegram считает N сообщениями
+    report = await Broadcaster().run([chat for chat in job.chats if chat.id not in processed], send_and_mark,
+                                     weight=len(job.media) or 1)
+
+    # Чаты без статуса (исчерпаны повторы после flood control) тоже считаются ошибкой
+    marked = await broadcast_queue.processed(job)
+    for chat in report.failed:
+        if chat.id not in marked:
+            await broadcast_queue.mark(job, chat.id, 'failed')
+
+    report.total = len(job.chats)
+    report.previously_sent = sum(1 for status in processed.values() if status == 'sent')
+    report.failed = [chat for chat in job.chats if processed.get(chat.id) == 'failed'] + report.failed
+
+    if len(report.failed) == 0:
+        await bot.send_message(job.admin_id, 'Сообщение успешно отправлено!\n' + report.summary())
+    else:
+        error_chats = [chat.name for chat in report.failed]
+        for split_message in split_message_for_tg(error_chats, report.summary() + '\nОшибка при отправке в чаты:'):
+            await bot.send_message(job.admin_id, split_message)
+
+
+async def send_chat_health_report(report: ChatHealthReport, bot: Bot):
+    for admin_id in settings.ADMINS_1.split('/'):
+        try:
+            for split_message in split_message_for_tg(report.lines()):
+                await bot.send_message(admin_id, split_message)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            logger.warning('Chat health report error: %s: %s', admin_id, e)
+
+
 start_message = "**Добавить чаты** - по нажатию на кнопку бот дает ссылку на добавления чатов, при нажатии на нее автоматически откроется меню TG с выбором чатов. После выбора чата необходимо просто нажат на кнопку 'Добавить бота' не добавляю ему каких либо привилегий. После добавления бот должен написать в чат 'Чат успешно добавлен'.\n\n**Удалить чаты** - по нажатию на кнопку выпадет меню со всеми подключенными чатами. При нажатии на чат он автоматически удалится.\n\n**Добавить операторов** - по нажатию выдаст ссылку-приглашение. Срок действия ссылки - 15 минут, после этого необходимо снова создать ссылку.\n\n**Удалить операторов** - по нажатию выпадает меню со всеми операторами. При нажатии удаляет оператора.\n"
 
 
@@ -117,7 +189,7 @@ async def update_keyboard(message: Message):
         except TelegramForbiddenError:
             continue
         except TelegramBadRequest:
-            print('Чат не найден с', admin.id)
+            logger.warning('Чат не найден с %s', admin.id)
     await message.answer('Клавиатура обновлена!')
 
 
@@ -143,34 +215,43 @@ async def get_ref(message: Message):
 
 @router.message(F.text.lower() == "удалить чаты")
 async def choosing_delete_chat_start(message: Message):
-    chats = await chat_service.filter(limit=1000, order=['name'])
-    for kb in get_chat_keyboards(chats, '2'):
-        await message.answer("Выберите чаты которые хотите удалить:",
-                             reply_markup=kb)
+    await message.answer("Выберите чаты которые хотите удалить:",
+                         reply_markup=await chat_pages.keyboard())
+
+
+@router.callback_query(chat_pages.filter())
+async def choosing_delete_chat_page(call: CallbackQuery):
+    await chat_pages.edit(call)
 
 
 @router.callback_query(F.data[0] == '2')
 async def delete_chat(call: CallbackQuery):
-    chat_id = int(call.data.split('|')[1])
-    if await chat_service.get(str(chat_id)):
-        await chat_service.delete(str(chat_id))
-        await operator_bot.bot.leave_chat(chat_id=chat_id)
+    _, chat_id, offset = call.data.split('|')
+    if await chat_service.get(chat_id):
+        await chat_service.delete(chat_id)
+        chat_exist_cache.invalidate(chat_id)
+        await operator_bot.bot.leave_chat(chat_id=int(chat_id))
 
-    await choosing_delete_chat_start(call.message)
+    await chat_pages.edit(call, offset=int(offset))
 
 
 @router.message(F.text.lower() == "удалить операторов")
 async def choosing_delete_admin_start(message: Message):
     await message.answer("Выберите операторов которых хотите удалить:",
-                         reply_markup=await create_admin_choosing())
+                         reply_markup=await operator_pages.keyboard())
+
+
+@router.callback_query(operator_pages.filter())
+async def choosing_delete_admin_page(call: CallbackQuery):
+    await operator_pages.edit(call)
 
 
 @router.callback_query(F.data[0] == '1')
 async def delete_admin(call: CallbackQuery):
-    operator_id = call.data.split('|')[1]
+    _, operator_id, offset = call.data.split('|')
 
     await operator_service.delete(operator_id)
-    await choosing_delete_admin_start(call.message)
+    await operator_pages.edit(call, offset=int(offset))
 
 
 @router.message(F.text.lower() == "отправить во все чаты", IsSuperAdmin())
@@ -183,102 +264,69 @@ async def send_all_command(message: Message, state: FSMContext):
 @router.message(SendMessageToAll.write_text)
 async def mass_mailing(message: Message, state: FSMContext, album: Optional[List[Message]] = None):
     message_id = (await state.get_data())['message_id']
-    chats: List[ChatBase] = await chat_service.filter(limit=1000)
-    send = {}
-    error_chats = []
+    chats: List[ChatBase] = await chat_directory.chats()
     if album:
         media_group = []
         for msg in album:
             if msg.photo:
-                file_id = msg.photo[-1].file_id
-                media_group.append(InputMediaPhoto(media=file_id, caption=msg.caption))
-                send.setdefault('photo', []).append((file_id, msg.caption))
-            else:
+                media_group.append({'type': 'photo', 'media': msg.photo[-1].file_id, 'caption': msg.caption})
+            elif msg.content_type in MEDIA_TYPES:
                 obj_dict = msg.model_dump()
                 file_id = obj_dict[msg.content_type]['file_id']
-                send.setdefault(msg.content_type, []).append((file_id, msg.caption))
-                if msg.document:
-                    media_group.append(InputMediaDocument(media=file_id, caption=msg.caption))
-                elif msg.video:
-                    media_group.append(InputMediaVideo(media=file_id, caption=msg.caption))
-                elif msg.audio:
-                    media_group.append(InputMediaAudio(media=file_id, caption=msg.caption))
-                elif msg.animation:
-                    media_group.append(InputMediaAnimation(media=file_id, caption=msg.caption))
-        # await state.set_data({'message': media_group, 'sent': []})
-        for i in chats:
-            chat = await fix_send_media_group(i, media_group)
-            if chat is not None:
-                error_chats.append(chat.name)
-
+                media_group.append({'type': msg.content_type, 'media': file_id, 'caption': msg.caption})
+        await broadcast_queue.enqueue(message.from_user.id, chats, media=media_group)
     else:
-        for i in chats:
-            chat = await fix_send_message(i, message.text)
-            if chat is not None:
-                error_chats.append(chat.name)
+        await broadcast_queue.enqueue(message.from_user.id, chats, text=message.text)
 
-    if len(error_chats) == 0:
-        await message.answer('Сообщение успешно отправлено!')
-    else:
-        for split_message in split_message_for_tg(error_chats, 'Ошибка при отправке в чаты:'):
-            await message.answer(split_message)
+    await message.answer('Рассылка запущена, по завершении придет отчет')
 
     await state.clear()
     await message.bot.delete_message(chat_id=message.from_user.id, message_id=message_id)
 
 
 @router.message(F.text.lower() == 'удалить сообщение')
-async def delete_message_command(data: Message | CallbackQuery, state: FSMContext):
-    chats = await chat_service.filter(limit=1000, order=['name'])
-
-    # TODO: CHANGE THIS SHIT
+async def delete_message_command(message: Message, state: FSMContext):
+    await message.answer("Выберите группу", reply_markup=await message_chat_pages.keyboard())
+    await state.set_data({})
+    await state.set_state(MessageDeleting.choosing_chat)
 
-    true_chats = [chat for chat in chats if await message_service.get_by_chat(chat.id)]
 
-    messages = []
-    for kb in get_chat_keyboards(true_chats, '3'):
-        if type(data) is Message:
-            msg = await data.answer("Выберите группу", reply_markup=kb)
-        else:
-            msg = await data.message.answer("Выберите группу", reply_markup=kb)
-        messages.append(msg.message_id)
-
-    await state.update_data({'messages_id': messages})
-    await state.set_state(MessageDeleting.choosing_chat)
+@router.callback_query(message_chat_pages.filter(), MessageDeleting.choosing_chat)
+async def choosing_message_chat_page(call: CallbackQuery):
+    await message_chat_pages.edit(call)
 
 
 @router.callback_query(F.data[0] == '3', MessageDeleting.choosing_chat)
 async def get_chat_for_message(call: CallbackQuery, state: FSMContext):
-    chat = await chat_service.get(call.data.split('|')[1])
-    state_data = await state.get_data()
-    messages = state_data['messages_id']
-    await state.update_data({'chat_id': int(call.data.split('|')[1])})
-    for i in messages:
-        await call.bot.delete_message(call.from_user.id, i)
-
-    messages = await message_service.get_by_chat(chat_id=chat.id)
-    msg = await call.message.answer(
-        f"Выбранный чат: {chat.name}\nТеперь выберите из списка или отправьте сообщением нужный номер",
-        reply_markup=deleting_messages_kb(messages))
-    await state.update_data({'message_id': msg.message_id, 'chat_id': chat.id})
+    _, chat_id, offset = call.data.split('|')
+    chat = await chat_service.get(chat_id)
+    await state.update_data({'message_id': call.message.message_id, 'chat_id': chat.id, 'chat_offset': int(offset)})
     await state.set_state(MessageDeleting.choosing_number)
+    await message_pages.edit(
+        call, offset=0, chat_id=chat.id,
+        text=f"Выбранный чат: {chat.name}\nТеперь выберите из списка или отправьте сообщением нужный номер")
+
+
+@router.callback_query(message_pages.filter(), MessageDeleting.choosing_number)
+async def choosing_message_page(call: CallbackQuery, state: FSMContext):
+    await message_pages.edit(call, chat_id=(await state.get_data())['chat_id'])
 
 
 @router.callback_query(F.data[0] == '5', MessageDeleting.choosing_number)
 async def return_to_chat_choosing(call: CallbackQuery, state: FSMContext):
-    await call.message.delete()
+    offset = (await state.get_data()).get('chat_offset', 0)
     await state.set_data({})
     await state.set_state(MessageDeleting.choosing_chat)
-    await delete_message_command(call, state)
+    await message_chat_pages.edit(call, offset=offset, text="Выберите группу")
 
 
 @router.callback_query(F.data[0] == '4', MessageDeleting.choosing_number)
 async def delete_message(call: CallbackQuery, state: FSMContext):
+    _, phone, offset = call.data.split('|')
     chat_id = (await state.get_data())['chat_id']
-    target_message: MessageBase = await message_service.get_by_phone(chat_id=chat_id,
-                                                                     phone=call.data.split('|')[1])
-    await call.message.answer(await fix_deleting_message(target_message))
-    await call.message.delete()
+    target_message: MessageBase = await message_service.get_by_phone(chat_id=chat_id, phone=phone)
+    await call.answer(await fix_deleting_message(target_message), show_alert=True)
+    await message_pages.edit(call, offset=int(offset), chat_id=chat_id)
 
 
 @router.message(MessageDeleting.choosing_number)
@@ -289,11 +337,11 @@ async def delete_message(message: Message, state: FSMContext):
         await message.answer('Введите телефон правильно!')
         return
 
-    numbers = [i[0] for i in re.finditer(r'((\+7|8|7)[\- ]?)[0-9]{10}', message.text)]
+    numbers = extract_phone_keys(message.text)
     if len(numbers) == 0:
         await message.answer('Введите телефон правильно!')
         return
-    target_number = numbers[0][-10:]
+    target_number = numbers[0]
 
     target_message: MessageBase = await message_service.get_by_phone(chat_id=str(state_data['chat_id']), phone=target_number)
 
@@ -305,6 +353,60 @@ async def delete_message(message: Message, state: FSMContext):
     await delete_message_command(message, state)
 
 
+@router.message(F.text.lower() == 'найти сообщение')
+async def search_message_command(message: Message, state: FSMContext):
+    await state.set_state(MessageSearch.write_query)
+    await message.answer(f'Отправьте часть номера или текста сообщения (не меньше {MIN_SEARCH_LENGTH} символов)',
+                         reply_markup=back_button())
+
+
+async def render_search_page(query: str, offset: int):
+    page = await message_service.search(query, limit=SEARCH_PAGE_SIZE, offset=offset)
+    if not page.items:
+        return f'По запросу "{query}" ничего не найдено', back_button()
+
+    lines = [f'Результаты по запросу "{query}":']
+    for i, message in enumerate(page.items, start=offset + 1):
+        text = message.message if len(message.message) <= 100 else message.message[:100] + '...'
+        lines.append(f'\n{i}. 8{message.phone} - {message.chat_name} ({message.created_at:%d.%m.%Y})\n{text}')
+    return '\n'.join(lines), search_results_kb(page, offset, SEARCH_PAGE_SIZE)
+
+
+@router.message(MessageSearch.write_query, F.text)
+async def search_message(message: Message, state: FSMContext):
+    query = message.text.strip()
+    if len(query) < MIN_SEARCH_LENGTH:
+        await message.answer(f'Запрос должен быть не короче {MIN_SEARCH_LENGTH} символов', reply_markup=back_button())
+        return
+
+    await state.update_data({'query': query, 'offset': 0})
+    text, kb = await render_search_page(query, 0)
+    await message.answer(text, reply_markup=kb)
+
+
+@router.callback_query(F.data[0] == '7', MessageSearch.write_query)
+async def search_message_page(call: CallbackQuery, state: FSMContext):
+    offset = int(call.data.split('|')[1])
+    query = (await state.get_data())['query']
+    await state.update_data({'offset': offset})
+    text, kb = await render_search_page(query, offset)
+    with suppress(TelegramBadRequest):
+        await call.message.edit_text(text, reply_markup=kb)
+
+
+@router.callback_query(F.data[0] == '6', MessageSearch.write_query)
+async def delete_found_message(call: CallbackQuery, state: FSMContext):
+    _, message_id, chat_id, phone = call.data.split('|')
+    target_message: MessageBase = await message_service.get_message(message_id=message_id, chat_id=chat_id,
+                                                                     phone=phone)
+    await call.answer(await fix_deleting_message(target_message), show_alert=True)
+
+    state_data = await state.get_data()
+    text, kb = await render_search_page(state_data['query'], state_data.get('offset', 0))
+    with suppress(TelegramBadRequest):
+        await call.message.edit_text(text, reply_markup=kb)
+
+
 @router.callback_query(F.data == 'back')
 async def back_to_menu(call: CallbackQuery, state: FSMContext):
     await state.clear()
@@ -1,22 +1,48 @@
-from typing import List
-
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
+from sqlalchemy import func
 
-from ..schemas.message_schema import MessageBase
+from src.use_cases.chat_keyboard_use_case import chat_directory
+from src.use_cases.pagination_use_case import Paginator
+from ..models.operator_model import OperatorModel
+from ..schemas.message_schema import MessageSearchPage
+from ..services.message_service import message_service
 from ..services.operator_service import operator_service
 
 
-async def create_admin_choosing():
-    all_admins = await operator_service.filter()
-    if all_admins is None:
-        all_admins = []
-    a = sorted(all_admins, key=lambda x: x.name.lower())
-    kb = []
-    for i in a:
-        kb.append(
-            [InlineKeyboardButton(text=i.name,
-                                  callback_data=f'1|{i.id}|0')])
-    return InlineKeyboardMarkup(inline_keyboard=kb)
+async def _operators_page(offset: int, limit: int):
+    # id - уникальный tiebreaker, иначе страницы с одинаковыми именами пересекаются
+    return await operator_service.filter(order=[func.lower(OperatorModel.name), OperatorModel.id],
+                                         limit=limit, offset=offset)
+
+
+async def _chats_with_messages_page(offset: int, limit: int):
+    return await message_service.get_chats_with_messages(limit=limit, offset=offset)
+
+
+async def _messages_page(offset: int, limit: int, chat_id: str):
+    return await message_service.get_by_chat(chat_id=chat_id, limit=limit, offset=offset)
+
+
+operator_pages = Paginator(
+    'operators', _operators_page,
+    lambda operator, offset: InlineKeyboardButton(text=operator.name, callback_data=f'1|{operator.id}|{offset}'),
+)
+
+chat_pages = Paginator(
+    'chats', chat_directory.page,
+    lambda chat, offset: InlineKeyboardButton(text=chat.name, callback_data=f'2|{chat.id}|{offset}'),
+)
+
+message_chat_pages = Paginator(
+    'message_chats', _chats_with_messages_page,
+    lambda row, offset: InlineKeyboardButton(text=f'{row[0].name} ({row[1]})', callback_data=f'3|{row[0].id}|{offset}'),
+)
+
+message_pages = Paginator(
+    'messages', _messages_page,
+    lambda message, offset: InlineKeyboardButton(text=f'8{message.phone}', callback_data=f'4|{message.phone}|{offset}'),
+    footer=[[InlineKeyboardButton(text='Вернуться к выбору чата', callback_data='5')]],
+)
 
 
 def create_menu(is_super_admin: bool = False):
@@ -29,7 +55,10 @@ def create_menu(is_super_admin: bool = False):
             KeyboardButton(text="Добавить операторов"),
             KeyboardButton(text="Удалить операторов")
         ],
-        [KeyboardButton(text='Удалить сообщение')]
+        [
+            KeyboardButton(text='Удалить сообщение'),
+            KeyboardButton(text='Найти сообщение')
+        ]
     ]
 
     if is_super_admin:
@@ -43,11 +72,19 @@ def create_menu(is_super_admin: bool = False):
     return keyboard
 
 
-def deleting_messages_kb(messages: List[MessageBase]):
+def search_results_kb(page: MessageSearchPage, offset: int, page_size: int):
     kb = []
-    for message in messages:
-        kb.append([InlineKeyboardButton(text=f'8{message.phone}', callback_data=f'4|{message.phone}|0')])
-    kb.append([InlineKeyboardButton(text='Вернуться к выбору чата', callback_data='5')])
+    for message in page.items:
+        kb.append([InlineKeyboardButton(text=f'Удалить 8{message.phone} ({message.chat_name})',
+                                        callback_data=f'6|{message.id}|{message.chat_id}|{message.phone}')])
+    navigation = []
+    if offset > 0:
+        navigation.append(InlineKeyboardButton(text='<', callback_data=f'7|{max(offset - page_size, 0)}'))
+    if page.next_offset is not None:
+        navigation.append(InlineKeyboardButton(text='>', callback_data=f'7|{page.next_offset}'))
+    if navigation:
+        kb.append(navigation)
+    kb.append([InlineKeyboardButton(text='Назад', callback_data='back')])
     return InlineKeyboardMarkup(inline_keyboard=kb)
 
 
@@ -1,20 +1,65 @@
-from datetime import datetime
+import random
+import time
 from typing import Callable, Dict, Any, Awaitable
 
 from aiogram.types import TelegramObject, Message, CallbackQuery
 
+from src.config.project_config import settings
+from src.logger import logger, update_context
+
 
 class LogMiddleware:
+    """
+    Outer middleware: заводит контекст апдейта для логов и пишет access log.
+    Доля записанных апдейтов задается LOG_ACCESS_SAMPLE_RATE, ошибки пишутся всегда.
+    """
+
+    def __init__(self, sample_rate: float = settings.LOG_ACCESS_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Message | CallbackQuery,
+            data: Dict[str, Any]
+    ) -> Any:
+        update = data.get('event_update')
+        context = {
+            'update_id': update.update_id if update else None,
+            'user_id': event.from_user.id if event.from_user else None,
+            'event': type(event).__name__,
+        }
+        token = update_context.set(context)
+        started = time.perf_counter()
+        try:
+            result = await handler(event, data)
+            if random.random() < self.sample_rate:
+                text_data = event.text if isinstance(event, Message) else event.data
+                logger.info('Update handled', extra={'fields': {
+                    'username': event.from_user.username if event.from_user else None,
+                    'text': text_data,
+                    'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+                }})
+            return result
+        except Exception:
+            logger.exception('Update error', extra={'fields': {
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            }})
+            raise
+        finally:
+            update_context.reset(token)
+
+class HandlerContextMiddleware:
+    """Inner middleware: дописывает в контекст апдейта имя выбранного хендлера"""
+
     async def __call__(
             self,
             handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
             event: Message | CallbackQuery,
             data: Dict[str, Any]
     ) -> Any:
-        text_data = type(event)
-        if type(event) == Message:
-            text_data = event.text
-        if type(event) == CallbackQuery:
-            text_data = event.data
-        print(datetime.now(), " From: ", event.from_user.id, " ", event.from_user.username, " Text data: ", text_data)
+        context = update_context.get()
+        handler_object = data.get('handler')
+        if context is not None and handler_object is not None:
+            context['handler'] = handler_object.callback.__name__
         return await handler(event, data)
@@ -1,7 +1,9 @@
-from sqlalchemy import select
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import load_only
 
 from ..models.chat_model import ChatModel
+from ..models.message_model import MessageModel
 from .sqlalchemy_repository import SqlAlchemyRepository, ModelType
 from src.config.database.db_helper import db_helper
 
@@ -31,5 +33,35 @@ class ChatRepository(SqlAlchemyRepository[ChatModel, ChatCreate, ChatUpdate]):
             row = await session.execute(stmt)
             return row.scalars().all()
 
+    async def migrate(self, old_id: str, new_id: str, name: str) -> ModelType:
+        """
+        Переносит чат и его сообщения на новый id (группа стала супергруппой) одной транзакцией.
+        Сообщения переезжают вместе с чатом через ON UPDATE CASCADE,
+        параллельные миграции одного чата ждут друг друга на advisory lock.
+        """
+        async with self._session_factory() as session:
+            await session.execute(select(func.pg_advisory_xact_lock(func.hashtext(old_id))))
+
+            new_exists = await session.scalar(
+                select(self.model.id).where(self.model.id == new_id).with_for_update()
+            )
+            if new_exists is None:
+                res = await session.execute(
+                    update(self.model).where(self.model.id == old_id).values(id=new_id)
+                )
+                if res.rowcount == 0:
+                    await session.execute(
+                        pg_insert(self.model).values(id=new_id, name=name).on_conflict_do_nothing()
+                    )
+            else:
+                await session.execute(
+                    update(MessageModel).where(MessageModel.chat_id == old_id).values(chat_id=new_id)
+                )
+                await session.execute(delete(self.model).where(self.model.id == old_id))
+
+            chat = await session.scalar(select(self.model).where(self.model.id == new_id))
+            await session.commit()
+            return chat
+
 
 chat_repository = ChatRepository(model=ChatModel, db_session=db_helper.get_db_session)
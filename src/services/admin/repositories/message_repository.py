@@ -1,7 +1,10 @@
-from sqlalchemy import select
+import re
+
+from sqlalchemy import func, or_, select
 
 from src.config.database.db_helper import db_helper
 from .sqlalchemy_repository import SqlAlchemyRepository, ModelType
+from ..models.chat_model import ChatModel
 from ..models.message_model import MessageModel
 from ..schemas.message_schema import MessageCreate, MessageUpdate
 
@@ -13,18 +16,87 @@ class MessageRepository(SqlAlchemyRepository[MessageModel, MessageCreate, Messag
             chat_id: str
     ) -> ModelType | None:
         async with self._session_factory() as session:
-            stmt = select(self.model).where(self.model.phone == phone, self.model.chat_id == chat_id).order_by(
-                self.model.created_at)
+            stmt = (
+                select(self.model)
+                .where(self.model.chat_id == chat_id, self.model.phone == phone)
+                .order_by(self.model.created_at)
+                .limit(1)
+            )
 
             row = await session.execute(stmt)
             return row.scalars().first()
 
-    async def get_by_chat(self, chat_id: str) -> list[ModelType] | None:
+    async def get_by_chat(
+            self,
+            chat_id: str,
+            limit: int | None = None,
+            offset: int = 0
+    ) -> list[ModelType] | None:
         async with self._session_factory() as session:
-            stmt = select(self.model).where(self.model.chat_id == chat_id).order_by(self.model.created_at)
+            stmt = (
+                select(self.model)
+                .where(self.model.chat_id == chat_id)
+                .order_by(self.model.created_at, self.model.id)
+                .limit(limit)
+                .offset(offset)
+            )
 
             row = await session.execute(stmt)
             return row.scalars().all()
 
+    async def get_chats_with_messages(
+            self,
+            limit: int | None = None,
+            offset: int = 0
+    ) -> list[tuple[ChatModel, int]]:
+        async with self._session_factory() as session:
+            stmt = (
+                select(ChatModel, func.count())
+                .join(self.model, self.model.chat_id == ChatModel.id)
+                .group_by(ChatModel.id)
+                .order_by(ChatModel.name, ChatModel.id)
+                .limit(limit)
+                .offset(offset)
+            )
+
+            row = await session.execute(stmt)
+            return [(chat, count) for chat, count in row.all()]
+
+    async def search(
+            self,
+            query: str,
+            chat_id: str | None = None,
+            limit: int = 10,
+            offset: int = 0,
+    ) -> list[tuple[ModelType, str]]:
+        """
+        Поиск по части номера или тексту сообщения, новые сообщения первыми.
+        ILIKE '%...%' обслуживается trigram GIN индексами, запрос должен быть не короче 3 символов.
+        """
+        query = query.strip()
+        escaped = re.sub(r'([\\%_])', r'\\\1', query)
+        conditions = [self.model.message.ilike(f'%{escaped}%', escape='\\')]
+
+        digits = re.sub(r'\D', '', query)
+        if len(digits) == 11 and digits[0] in '78':
+            digits = digits[1:]
+        if len(digits) >= 3:
+            conditions.append(self.model.phone.like(f'%{digits}%'))
+
+        async with self._session_factory() as session:
+            stmt = (
+                select(self.model, ChatModel.name)
+                .join(ChatModel, ChatModel.id == self.model.chat_id)
+                .where(or_(*conditions))
+                .order_by(self.model.created_at.desc(), self.model.id.desc())
+                .limit(limit)
+                .offset(offset)
+            )
+            if chat_id is not None:
+                stmt = stmt.where(self.model.chat_id == chat_id)
+
+            row = await session.execute(stmt)
+            return [(message, chat_name) for message, chat_name in row.all()]
+
 
 message_repository = MessageRepository(model=MessageModel, db_session=db_helper.get_db_session)
@@ -1,7 +1,8 @@
-from typing import Type, TypeVar, Optional, Generic
+from typing import Any, Dict, Iterable, List, Type, TypeVar, Optional, Generic
 
 from pydantic import BaseModel
-from sqlalchemy import delete, select, update
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.base_model import Base
@@ -12,6 +13,9 @@ ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# Ограничение PostgreSQL на число параметров в одном запросе
+MAX_QUERY_PARAMS = 32767
+
 
 class SqlAlchemyRepository(AbstractRepository, Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
@@ -21,11 +25,47 @@ class SqlAlchemyRepository(AbstractRepository, Generic[ModelType, CreateSchemaTy
 
     async def create(self, data: CreateSchemaType) -> ModelType:
         async with self._session_factory() as session:
-            instance = self.model(**data)
-            session.add(instance)
+            stmt = insert(self.model).values(**data).returning(self.model)
+            res = await session.execute(stmt)
+            await session.commit()
+            return res.scalar_one()
+
+    async def upsert_many(
+            self,
+            data: List[Dict[str, Any]],
+            on_conflict: str = "nothing",
+            update_fields: List[str] | None = None,
+    ) -> None:
+        """
+        Вставляет строки через INSERT ... ON CONFLICT по первичному ключу,
+        по одному запросу на пачку строк.
+        on_conflict="nothing" пропускает существующие строки,
+        on_conflict="update" перезаписывает в них update_fields (по умолчанию все неключевые поля).
+        """
+        if on_conflict not in ("nothing", "update"):
+            raise ValueError(f"Unknown on_conflict policy: {on_conflict}")
+        if not data:
+            return
+
+        table = self.model.__table__
+        index_elements = [column.name for column in table.primary_key]
+        if update_fields is None:
+            update_fields = [column.name for column in table.columns
+                             if not column.primary_key and column.name in data[0]]
+        chunk_size = max(MAX_QUERY_PARAMS // len(data[0]), 1)
+
+        async with self._session_factory() as session:
+            for i in range(0, len(data), chunk_size):
+                stmt = pg_insert(self.model).values(data[i:i + chunk_size])
+                if on_conflict == "update" and update_fields:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=index_elements,
+                        set_={field: stmt.excluded[field] for field in update_fields},
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+                await session.execute(stmt)
             await session.commit()
-            await session.refresh(instance)
-            return instance
 
     async def update(self, data: UpdateSchemaType, **filters) -> ModelType:
         async with self._session_factory() as session:
@@ -39,6 +79,15 @@ class SqlAlchemyRepository(AbstractRepository, Generic[ModelType, CreateSchemaTy
             await session.execute(delete(self.model).filter_by(**filters))
             await session.commit()
 
+    async def delete_many(self, keys: Iterable[Any], field: str = "id", **filters) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+        async with self._session_factory() as session:
+            stmt = delete(self.model).where(getattr(self.model, field).in_(keys)).filter_by(**filters)
+            await session.execute(stmt)
+            await session.commit()
+
     async def get_single(self, **filters) -> Optional[ModelType] | None:
         async with self._session_factory() as session:
             row = await session.execute(select(self.model).filter_by(**filters))
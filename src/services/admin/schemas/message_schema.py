@@ -1,3 +1,6 @@
+from datetime import datetime
+from typing import List
+
 from pydantic import BaseModel
 
 
@@ -22,3 +25,13 @@ class MessageResponse(MessageBase):
 
 class MessageListResponse(MessageBase):
     pass
+
+
+class MessageSearchResult(MessageBase):
+    chat_name: str
+    created_at: datetime
+
+
+class MessageSearchPage(BaseModel):
+    items: List[MessageSearchResult]
+    next_offset: int | None = None
@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta
 from random import randint
 
+from src.config.database.db_helper import db_helper
+from src.use_cases.membership_cache_use_case import admin_cache
 from ..repositories.sqlalchemy_repository import ModelType
 from .base_service import BaseService
 from ..repositories.admin_repository import admin_repository
@@ -24,7 +26,7 @@ class AdminService(BaseService):
         )
 
     async def exists(self, admin_id: str) -> bool:
-        return await self.repository.exists(id=admin_id)
+        return await admin_cache.get_or_load(admin_id, lambda: self.repository.exists(id=admin_id))
 
     async def get_with_update(self, admin_id: str) -> ModelType | None:
         admin = await self.repository.get_single(id=admin_id)
@@ -43,7 +45,9 @@ class AdminService(BaseService):
         return admin.invite_hash == invite_hash and admin.invite_date >= datetime.now()
 
     async def fast_create(self, pk: str) -> ModelType:
-        return await self.create(AdminCreate(id=pk, invite_hash=hash(randint(10000, 10000000))))
+        admin = await self.create(AdminCreate(id=pk, invite_hash=hash(randint(10000, 10000000))))
+        db_helper.after_commit(lambda: admin_cache.invalidate(pk))
+        return admin
 
 
 admin_service = AdminService(repository=admin_repository)
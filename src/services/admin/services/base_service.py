@@ -1,3 +1,5 @@
+from typing import List
+
 from ..schemas.base_schema import PyModel
 from ..repositories.base_repository import AbstractRepository
 from ..repositories.sqlalchemy_repository import ModelType
@@ -17,5 +19,11 @@ class BaseService:
     async def delete(self, pk: str) -> None:
         await self.repository.delete(id=pk)
 
+    async def upsert_many(self, models: List[PyModel], on_conflict: str = "nothing") -> None:
+        await self.repository.upsert_many(data=[model.model_dump() for model in models], on_conflict=on_conflict)
+
+    async def delete_many(self, pks: List[str], **filters) -> None:
+        await self.repository.delete_many(keys=pks, **filters)
+
     async def get(self, pk: str) -> ModelType:
         return await self.repository.get_single(id=pk)
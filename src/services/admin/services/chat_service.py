@@ -1,6 +1,11 @@
+from typing import List
+
+from src.config.database.db_helper import db_helper
+from src.use_cases.chat_keyboard_use_case import chat_directory
 from .base_service import BaseService
 from ..repositories.chat_repository import chat_repository
 from ..repositories.sqlalchemy_repository import ModelType
+from ..schemas.base_schema import PyModel
 
 
 class ChatService(BaseService):
@@ -18,5 +23,32 @@ class ChatService(BaseService):
             offset=offset
         )
 
+    async def create(self, model: PyModel) -> ModelType:
+        chat = await super().create(model)
+        db_helper.after_commit(chat_directory.bump)
+        return chat
+
+    async def update(self, pk: str, model: PyModel) -> ModelType:
+        chat = await super().update(pk, model)
+        db_helper.after_commit(chat_directory.bump)
+        return chat
+
+    async def delete(self, pk: str) -> None:
+        await super().delete(pk)
+        db_helper.after_commit(chat_directory.bump)
+
+    async def migrate(self, old_id: str, new_id: str, name: str) -> ModelType:
+        chat = await self.repository.migrate(old_id=old_id, new_id=new_id, name=name)
+        db_helper.after_commit(chat_directory.bump)
+        return chat
+
+    async def upsert_many(self, models: List[PyModel], on_conflict: str = "nothing") -> None:
+        await super().upsert_many(models, on_conflict)
+        db_helper.after_commit(chat_directory.bump)
+
+    async def delete_many(self, pks: List[str], **filters) -> None:
+        await super().delete_many(pks, **filters)
+        db_helper.after_commit(chat_directory.bump)
+
 
 chat_service = ChatService(repository=chat_repository)
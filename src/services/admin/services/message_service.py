@@ -1,14 +1,37 @@
 from .base_service import BaseService
+from ..models.chat_model import ChatModel
 from ..repositories.message_repository import message_repository
 from ..repositories.sqlalchemy_repository import ModelType
+from ..schemas.message_schema import MessageSearchPage, MessageSearchResult
+
+MIN_SEARCH_LENGTH = 3
 
 
 class MessageService(BaseService):
     async def get_by_phone(self, phone: str, chat_id: str) -> ModelType | None:
         return await self.repository.get_by_phone(phone=phone, chat_id=chat_id)
 
-    async def get_by_chat(self, chat_id: str) -> list[ModelType] | None:
-        return await self.repository.get_by_chat(chat_id=chat_id)
+    async def get_message(self, message_id: str, chat_id: str, phone: str) -> ModelType | None:
+        return await self.repository.get_single(id=message_id, chat_id=chat_id, phone=phone)
+
+    async def get_by_chat(self, chat_id: str, limit: int | None = None, offset: int = 0) -> list[ModelType] | None:
+        return await self.repository.get_by_chat(chat_id=chat_id, limit=limit, offset=offset)
+
+    async def get_chats_with_messages(self, limit: int | None = None,
+                                      offset: int = 0) -> list[tuple[ChatModel, int]]:
+        return await self.repository.get_chats_with_messages(limit=limit, offset=offset)
+
+    async def search(self, query: str, chat_id: str | None = None, limit: int = 10,
+                     offset: int = 0) -> MessageSearchPage:
+        if len(query.strip()) < MIN_SEARCH_LENGTH:
+            return MessageSearchPage(items=[])
+        rows = await self.repository.search(query=query, chat_id=chat_id, limit=limit + 1, offset=offset)
+        items = [
+            MessageSearchResult(id=message.id, chat_id=message.chat_id, phone=message.phone,
+                                message=message.message, chat_name=chat_name, created_at=message.created_at)
+            for message, chat_name in rows[:limit]
+        ]
+        return MessageSearchPage(items=items, next_offset=offset + limit if len(rows) > limit else None)
 
 
 message_service = MessageService(repository=message_repository)
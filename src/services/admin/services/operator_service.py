@@ -1,3 +1,7 @@
+from typing import List
+
+from src.config.database.db_helper import db_helper
+from src.use_cases.membership_cache_use_case import operator_cache
 from .base_service import BaseService
 from ..repositories.operator_repository import operator_repository
 from ..repositories.sqlalchemy_repository import ModelType
@@ -18,5 +22,18 @@ class OperatorService(BaseService):
             offset=offset
         )
 
+    async def delete(self, pk: str) -> None:
+        await super().delete(pk)
+        db_helper.after_commit(lambda: operator_cache.invalidate(pk))
+
+    async def delete_many(self, pks: List[str], **filters) -> None:
+        await super().delete_many(pks, **filters)
+
+        def invalidate():
+            for pk in pks:
+                operator_cache.invalidate(pk)
+
+        db_helper.after_commit(invalidate)
+
 
 operator_service = OperatorService(repository=operator_repository)
@@ -3,10 +3,11 @@ from aiogram import Bot, Dispatcher
 from .handlers import operator, user_register, group_register, channel_register
 from .middlewares.permission_middleware import PermissionMiddleware
 from src.config.project_config import settings
+from src.logger import logger
 
 
 async def on_startup():
-    print('Оператор вышел в онлайн')
+    logger.info('Оператор вышел в онлайн')
 
 
 class OperatorBot:
@@ -24,7 +25,10 @@ class OperatorBot:
 
     async def start_bot(self, dp: Dispatcher):
         self.register_dispatcher(dp)
-        await self.bot.delete_webhook(drop_pending_updates=True)
-        print("operator -", await self.bot.get_me())
+        # В режиме webhook вебхук ставит start_bots_webhook, удалять его нельзя:
+        # это сбросит накопившиеся апдейты и отключит вебхук для остальных реплик
+        if settings.BOT_MODE != 'webhook':
+            await self.bot.delete_webhook(drop_pending_updates=True)
+        logger.info("operator - %s", await self.bot.get_me())
 
 operator_bot = OperatorBot()
@@ -2,6 +2,9 @@ from aiogram.filters import BaseFilter
 from aiogram.types import CallbackQuery, Message
 from aiogram.exceptions import TelegramBadRequest
 
+from src.logger import logger
+from src.use_cases.membership_cache_use_case import chat_exist_cache
+
 
 class ChatExistFilter(BaseFilter):
     def __init__(self, get_chat_id_func, entity: str = 'call'):
@@ -13,14 +16,22 @@ class ChatExistFilter(BaseFilter):
         entity = m
         if not isinstance(entity, (Message, CallbackQuery)[self.entity_for_find == 'call']):
             return False
-        try:
-            await entity.bot.get_chat(
-                chat_id=self.get_chat_id(entity)
-            )
-        except TelegramBadRequest as e:
-            if "chat not found" not in str(e).lower():
-                print(e)
-                return False
+        chat_id = str(self.get_chat_id(entity))
+        exists = chat_exist_cache.get(chat_id)
+        if exists is None:
+            try:
+                await entity.bot.get_chat(
+                    chat_id=chat_id
+                )
+            except TelegramBadRequest as e:
+                if "chat not found" not in str(e).lower():
+                    logger.warning('Get chat error: %s', e)
+                    return False
+                exists = False
+            else:
+                exists = True
+            chat_exist_cache.set(chat_id, exists)
+        if not exists:
             if isinstance(entity, Message):
                 await entity.answer(
                     'Сохранен неправильный чат, удалите и добавьте бота заного!')
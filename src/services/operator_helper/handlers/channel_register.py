@@ -2,6 +2,8 @@ from aiogram import Router, Bot, F
 from aiogram.filters import ChatMemberUpdatedFilter, JOIN_TRANSITION, LEAVE_TRANSITION
 from aiogram.types import ChatMemberUpdated, Message
 
+from src.logger import logger
+from src.use_cases.membership_cache_use_case import chat_exist_cache
 from src.services.operator_helper.filters.chat_type import ChatTypeFilter
 from src.services.operator_helper.schemas.chat_schema import ChatCreate, ChatUpdate
 from src.services.operator_helper.services.admin_service import admin_service
@@ -18,19 +20,19 @@ async def add_channel(event: ChatMemberUpdated, bot: Bot):
         await bot.leave_chat(event.chat.id)
         return
     await chat_service.create(ChatCreate(id=str(event.chat.id), name=event.chat.full_name))
-    print(f'Новый канал!\nid: {event.chat.id}\nname: {event.chat.full_name}')
+    logger.info('Новый канал! id: %s name: %s', event.chat.id, event.chat.full_name)
 
 
 @router.my_chat_member(ChatMemberUpdatedFilter(member_status_changed=LEAVE_TRANSITION))
 async def add_chat(event: ChatMemberUpdated):
     await chat_service.delete(str(event.chat.id))
-    print(f'Канал удален!\nid: {event.chat.id}\nname: {event.chat.full_name}')
+    chat_exist_cache.invalidate(str(event.chat.id))
+    logger.info('Канал удален! id: %s name: %s', event.chat.id, event.chat.full_name)
 
 
 @router.message(F.migrate_to_chat_id)
 async def group_to_supegroup_migration(message: Message):
-    await chat_service.delete(message.chat.id)
-    await chat_service.create(ChatCreate(id=str(message.migrate_to_chat_id), name=message.chat.full_name))
+    await chat_service.migrate(str(message.chat.id), str(message.migrate_to_chat_id), message.chat.full_name)
 
 
 @router.message(F.new_chat_title)
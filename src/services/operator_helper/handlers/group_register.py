@@ -2,12 +2,13 @@ from aiogram import Router, Bot, F
 from aiogram.filters import ChatMemberUpdatedFilter, JOIN_TRANSITION, LEAVE_TRANSITION
 from aiogram.types import ChatMemberUpdated, Message
 
+from src.logger import logger
+from src.use_cases.membership_cache_use_case import chat_exist_cache
+
 from ..filters.chat_type import ChatTypeFilter
 from ..schemas.chat_schema import ChatCreate, ChatUpdate
-from ..schemas.message_schema import MessageCreate
 from ..services.admin_service import admin_service
 from ..services.chat_service import chat_service
-from ..services.message_service import message_service
 
 router = Router()
 router.my_chat_member.filter(ChatTypeFilter(is_group=True))
@@ -21,25 +22,20 @@ async def add_chat(event: ChatMemberUpdated, bot: Bot):
         await bot.leave_chat(event.chat.id)
         return
     await chat_service.create(ChatCreate(id=str(event.chat.id), name=event.chat.full_name))
-    print(f'Новый чат!\nid: {event.chat.id}\nname: {event.chat.full_name}')
+    logger.info('Новый чат! id: %s name: %s', event.chat.id, event.chat.full_name)
     await event.answer('Чат успешно добавлен!')
 
 
 @router.my_chat_member(ChatMemberUpdatedFilter(member_status_changed=LEAVE_TRANSITION))
 async def delete_chat(event: ChatMemberUpdated):
     await chat_service.delete(str(event.chat.id))
-    print(f'Чат удален!\nid: {event.chat.id}\nname: {event.chat.full_name}')
+    chat_exist_cache.invalidate(str(event.chat.id))
+    logger.info('Чат удален! id: %s name: %s', event.chat.id, event.chat.full_name)
 
 
 @router.message(F.migrate_to_chat_id)
 async def group_to_supegroup_migration(message: Message):
-    chat_messages = await message_service.get_by_chat(chat_id=str(message.chat.id))
-    await chat_service.delete(message.chat.id)
-    await chat_service.create(ChatCreate(id=str(message.migrate_to_chat_id), name=message.chat.full_name))
-    await message_service.create_many([MessageCreate(id=i.id,
-                                                     chat_id=str(message.migrate_to_chat_id),
-                                                     phone=i.phone,
-                                                     message=i.message) for i in chat_messages])
+    await chat_service.migrate(str(message.chat.id), str(message.migrate_to_chat_id), message.chat.full_name)
 
 
 @router.message(F.new_chat_title)
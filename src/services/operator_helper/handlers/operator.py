@@ -1,8 +1,6 @@
-import re
 from contextlib import suppress
 from typing import Optional, List
 
-import phonenumbers
 from aiogram import Router, F
 from aiogram.exceptions import TelegramBadRequest, TelegramMigrateToChat
 from aiogram.filters import Command, StateFilter, or_f, and_f
@@ -10,15 +8,14 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import CallbackQuery, Message, InputMediaPhoto, InputMediaDocument, InputMediaVideo, InputMediaAudio, \
     InputMediaAnimation
-from phonenumbers import NumberParseException
-from sqlalchemy.exc import IntegrityError
 
-from src.use_cases.chat_keyboard_use_case import get_chat_keyboards
+from src.logger import logger
+from src.use_cases.membership_cache_use_case import chat_exist_cache, invalidate_chat_on_error
+from src.use_cases.phone_use_case import extract_phone_keys, validate_phone
 from ..filters.chat_exist import ChatExistFilter
 from ..filters.chat_type import ChatTypeFilter
 from ..keyboards.operator_kb import *
 from ..models.chat_model import ChatModel
-from ..schemas.chat_schema import ChatCreate
 from ..schemas.message_schema import MessageCreate
 from ..services.chat_service import chat_service
 from ..services.message_service import message_service
@@ -93,58 +90,36 @@ async def prev_state(call: CallbackQuery, state: FSMContext):
 
 @router.message(or_f(StateFilter(None), and_f(F.text.contains('Отправить сообщение'), OrderSend.write_comment)))
 async def activate_sender(message: Message, state: FSMContext):
-    messages = []
-    chats = await chat_service.filter(limit=1000, order=['name'])
-    for kb in get_chat_keyboards(chats, '0'):
-        m = await message.answer("Выберите подключенный чат:",
-                                 reply_markup=kb)
-        messages.append(m.message_id)
-    await state.update_data({'messages': messages})
+    await message.answer("Выберите подключенный чат:",
+                         reply_markup=await chat_pages.keyboard())
 
 
 @router.callback_query(F.data[0] == '1')
 async def choosing_chats(call: CallbackQuery, state: FSMContext):
     await state.set_data({})
-    messages = []
-    chats = await chat_service.filter(limit=1000, order=['name'])
-    for i, kb in enumerate(get_chat_keyboards(chats, '0')):
-        if i == 0:
-            m = await call.message.edit_text("Выберите подключенный чат:",
-                                             reply_markup=kb)
-        else:
-            m = await call.message.answer("Выберите подключенный чат:",
-                                          reply_markup=kb)
-        messages.append(m.message_id)
-    await state.update_data({'messages': messages})
+    await chat_pages.edit(call, offset=0, text="Выберите подключенный чат:")
+
+
+@router.callback_query(chat_pages.filter())
+async def choosing_chats_page(call: CallbackQuery):
+    await chat_pages.edit(call)
 
 
 @router.callback_query(F.data[0] == '0', ChatExistFilter(lambda x: x.data.split('|')[1]))
 async def active_mail_message(call: CallbackQuery, state: FSMContext):
     chat: ChatModel = await chat_service.get(call.data.split('|')[1])
-    state_data = await state.get_data()
-    messages = state_data.get('messages', [])
     await state.update_data({'chat_id': int(call.data.split('|')[1])})
-    for i in messages:
-        with suppress(TelegramBadRequest):
-            await call.bot.delete_message(call.from_user.id, i)
+    with suppress(TelegramBadRequest):
+        await call.message.delete()
 
     await call.message.answer(f"Выбранный чат: {chat.name}\nТеперь отправьте телефон клиента",
                               reply_markup=back())
     await state.set_state(OrderSend.write_number)
 
 
-def validate_phone_lib(phone: str, region: str = "RU") -> str | None:
-    try:
-        pn = phonenumbers.parse(phone, region)
-        if phonenumbers.is_valid_number(pn):
-            return phonenumbers.format_number(pn, phonenumbers.PhoneNumberFormat.INTERNATIONAL)
-    except NumberParseException:
-        return None
-
-
 @router.message(OrderSend.write_number)
 async def write_number(message: Message, state: FSMContext):
-    phone = validate_phone_lib(message.text)
+    phone = validate_phone(message.text or '')
     if phone is None:
         await message.answer("Введите корректный номер", reply_markup=back())
         return
@@ -170,25 +145,23 @@ async def except_when_send_video(send_video_func, *args, **kwargs) -> Message:
     try:
         r = await send_video_func(*args, **kwargs)
     except TelegramMigrateToChat as e:
-        await chat_service.delete(str(chat_id))
-        try:
-            await chat_service.create(ChatCreate(id=str(e.migrate_to_chat_id), name=chat_name))
-        except IntegrityError:
-            print('Supergroup already exists', chat_id)
+        await chat_service.migrate(str(chat_id), str(e.migrate_to_chat_id), chat_name)
+        chat_exist_cache.invalidate(str(chat_id))
 
         try:
             chat_id = str(e.migrate_to_chat_id)
             kwargs["chat_id"] = chat_id
             r = await send_video_func(*args, **kwargs)
         except Exception as e:
-            print('Error:', chat_id, chat_name)
-            print(f'Send to chat error: {e}')
+            logger.warning('Send to chat error: %s %s: %s', chat_id, chat_name, e)
+            invalidate_chat_on_error(chat_id, e)
             return None
 
     except Exception as e:
-        print('Error:', chat_id, chat_name)
-        print(f'Send to chat error: {e}')
+        logger.warning('Send to chat error: %s %s: %s', chat_id, chat_name, e)
+        invalidate_chat_on_error(chat_id, e)
         return None
+    chat_exist_cache.set(str(chat_id), True)
     return r
 
 
@@ -258,10 +231,9 @@ async def send_message_to_selected_chat(message: Message,
             )
 
     if text_data:
-        numbers = re.finditer(r'((\+7|8|7)[\- ]?)[0-9]{10}', text_data)
         await message_service.create_many(
-            [MessageCreate(id=str(send_message.message_id), chat_id=str(chat_id), phone=number[0][-10:],
-                           message=text_data) for number in set(numbers)])
+            [MessageCreate(id=str(send_message.message_id), chat_id=str(chat_id), phone=phone_key,
+                           message=text_data) for phone_key in extract_phone_keys(text_data)])
 
     await message.answer('Сообщение успешно отправлено!')
     await state.clear()
@@ -4,6 +4,8 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 from aiogram.utils.payload import decode_payload
 
+from src.logger import logger
+
 from .operator import menu
 from ..filters.chat_type import ChatTypeFilter
 from ..services.admin_service import admin_service
@@ -30,6 +32,6 @@ async def add_operator(message: Message, command: CommandObject, state: FSMConte
         return
     name = message.from_user.full_name if message.from_user.username is None else message.from_user.username
     await operator_service.create(OperatorCreate(id=str(message.from_user.id), name=name))
-    print(f'Новый оператор!\nid: {message.from_user.id}\nusername: {message.from_user.username}')
+    logger.info('Новый оператор! id: %s username: %s', message.from_user.id, message.from_user.username)
     await message.answer('Вы теперь оператор!')
     await menu(message, state)
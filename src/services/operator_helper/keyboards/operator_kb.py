@@ -1,6 +1,13 @@
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton, WebAppInfo
 
 from src.config.project_config import settings
+from src.use_cases.chat_keyboard_use_case import chat_directory
+from src.use_cases.pagination_use_case import Paginator
+
+chat_pages = Paginator(
+    'chats', chat_directory.page,
+    lambda chat, offset: InlineKeyboardButton(text=chat.name, callback_data=f'0|{chat.id}|{offset}'),
+)
 
 
 def create_menu():
@@ -1,15 +1,46 @@
 import asyncio
+import time
+from contextlib import suppress
+from dataclasses import dataclass, field
 from typing import Callable, Awaitable, Any, Union
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message
+from redis.asyncio import Redis
+
+MAX_ALBUM_SIZE = 10
+
+CLAIM_ALBUM_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return nil
+end
+local parts = redis.call('lrange', KEYS[1], 0, -1)
+redis.call('del', KEYS[1], KEYS[2])
+return parts
+"""
+
+
+@dataclass
+class _Album:
+    messages: list[Message]
+    first_at: float
+    last_at: float
+    updated: asyncio.Event = field(default_factory=asyncio.Event)
 
 
 class AlbumMiddleware(BaseMiddleware):
-    album_data: dict = {}
+    """
+    Собирает части альбома в data["album"]. Альбом считается полным, когда
+    после последней части прошло `latency` секунд, но не позже `max_latency`
+    секунд после первой части или сразу после 10-й части.
+    """
 
-    def __init__(self, latency: Union[int, float] = 2):
+    def __init__(self, latency: Union[int, float] = 0.5, max_latency: Union[int, float] = 2,
+                 max_albums: int = 1000):
         self.latency = latency
+        self.max_latency = max_latency
+        self.max_albums = max_albums
+        self.album_data: dict[str, _Album] = {}
 
     async def __call__(
             self,
@@ -20,16 +51,91 @@ class AlbumMiddleware(BaseMiddleware):
         if not message.media_group_id:
             await handler(message, data)
             return
-        try:
-            self.album_data[message.media_group_id].append(message)
-        except KeyError:
-            self.album_data[message.media_group_id] = [message]
-            await asyncio.sleep(self.latency)
 
-            data['_is_last'] = True
-            data["album"] = self.album_data[message.media_group_id]
+        loop = asyncio.get_running_loop()
+        album = self.album_data.get(message.media_group_id)
+        if album is not None:
+            album.messages.append(message)
+            album.last_at = loop.time()
+            album.updated.set()
+            return
+
+        if len(self.album_data) >= self.max_albums:
+            data["album"] = [message]
             await handler(message, data)
+            return
 
-        if message.media_group_id and data.get("_is_last"):
+        album = self.album_data[message.media_group_id] = _Album([message], loop.time(), loop.time())
+        try:
+            while len(album.messages) < MAX_ALBUM_SIZE:
+                wait = min(album.last_at + self.latency, album.first_at + self.max_latency) - loop.time()
+                if wait <= 0:
+                    break
+                album.updated.clear()
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(album.updated.wait(), wait)
+        finally:
             del self.album_data[message.media_group_id]
-            del data['_is_last']
+
+        data["album"] = sorted(album.messages, key=lambda m: m.message_id)
+        await handler(message, data)
+
+
+class RedisAlbumMiddleware(BaseMiddleware):
+    """
+    Сборка альбома через Redis для нескольких воркеров или реплик.
+
+    album:<media_group_id>        - части альбома (JSON сообщений)
+    album:<media_group_id>:meta   - first_at / last_at
+
+    Каждый воркер, получивший часть, ждет того же таймера тишины, что и AlbumMiddleware,
+    после чего пытается забрать альбом скриптом CLAIM_ALBUM_SCRIPT: список читается
+    и удаляется атомарно, поэтому обработчик запускает ровно один воркер.
+    """
+
+    def __init__(self, redis: Redis, latency: Union[int, float] = 0.5, max_latency: Union[int, float] = 2,
+                 ttl: int = 60, prefix: str = 'album'):
+        self.redis = redis
+        self.latency = latency
+        self.max_latency = max_latency
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def __call__(
+            self,
+            handler: Callable[[Message, dict[str, Any]], Awaitable[Any]],
+            message: Message,
+            data: dict[str, Any]
+    ) -> Any:
+        if not message.media_group_id:
+            await handler(message, data)
+            return
+
+        key = f'{self.prefix}:{message.media_group_id}'
+        meta_key = f'{key}:meta'
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, message.model_dump_json(exclude_unset=True, by_alias=True))
+            pipe.hsetnx(meta_key, 'first_at', now)
+            pipe.hset(meta_key, 'last_at', now)
+            pipe.expire(key, self.ttl)
+            pipe.expire(meta_key, self.ttl)
+            size, *_ = await pipe.execute()
+
+        while size < MAX_ALBUM_SIZE:
+            first_at, last_at = await self.redis.hmget(meta_key, 'first_at', 'last_at')
+            if first_at is None or last_at is None:
+                return
+            wait = min(float(last_at) + self.latency, float(first_at) + self.max_latency) - time.time()
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+            size = await self.redis.llen(key)
+
+        parts = await self.redis.eval(CLAIM_ALBUM_SCRIPT, 2, key, meta_key)
+        if not parts:
+            return
+
+        album = [Message.model_validate_json(part, context={"bot": message.bot}) for part in parts]
+        data["album"] = sorted(album, key=lambda m: m.message_id)
+        await handler(message, data)
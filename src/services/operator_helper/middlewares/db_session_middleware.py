@@ -0,0 +1,41 @@
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from src.config.database.db_helper import db_helper, unit_of_work_session
+
+
+class DbSessionMiddleware:
+    """Outer middleware апдейта: одна сессия БД на весь апдейт, транзакция фиксируется при выходе"""
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any]
+    ) -> Any:
+        async with db_helper.unit_of_work() as session:
+            data['db_session'] = session
+            return await handler(event, data)
+
+
+class UnitOfWorkCheckpointMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии бота: перед каждым запросом к Bot API фиксирует unit of work текущего апдейта.
+    Транзакция охватывает работу с БД между вызовами API, а не весь хендлер.
+    """
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        session = unit_of_work_session.get()
+        if session is not None:
+            await session.checkpoint()
+        return await make_request(bot, method)
@@ -0,0 +1,25 @@
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram.types import TelegramObject, Message, CallbackQuery
+
+from src.metrics import HANDLER_DURATION, HANDLER_ERRORS, HANDLERS_IN_FLIGHT, observe
+
+
+class MetricsMiddleware:
+    """Inner middleware: длительность, ошибки и число выполняющихся хендлеров"""
+
+    def __init__(self, bot_name: str):
+        self.bot_name = bot_name
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Message | CallbackQuery,
+            data: Dict[str, Any]
+    ) -> Any:
+        callback = data['handler'].callback
+        router = callback.__module__.rsplit('.', 1)[-1]
+        with HANDLERS_IN_FLIGHT.labels(self.bot_name).track_inprogress():
+            with observe(HANDLER_DURATION, HANDLER_ERRORS,
+                         bot=self.bot_name, router=router, handler=callback.__name__):
+                return await handler(event, data)
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Text, ForeignKey
+from sqlalchemy import String, Text, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base_model import Base
@@ -6,8 +6,15 @@ from .base_model import Base
 
 class MessageModel(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index('ix_messages_chat_id_phone_created_at', 'chat_id', 'phone', 'created_at'),
+        Index('ix_messages_chat_id_created_at', 'chat_id', 'created_at'),
+        Index('ix_messages_phone_trgm', 'phone', postgresql_using='gin', postgresql_ops={'phone': 'gin_trgm_ops'}),
+        Index('ix_messages_message_trgm', 'message', postgresql_using='gin', postgresql_ops={'message': 'gin_trgm_ops'}),
+    )
 
     id: Mapped[str] = mapped_column(String, primary_key=True)
-    chat_id: Mapped[str] = mapped_column(ForeignKey('chats.id', ondelete='CASCADE'))
+    chat_id: Mapped[str] = mapped_column(ForeignKey('chats.id', ondelete='CASCADE', onupdate='CASCADE'),
+                                         primary_key=True)
     phone: Mapped[str] = mapped_column(String, primary_key=True)
     message: Mapped[str] = mapped_column(Text)
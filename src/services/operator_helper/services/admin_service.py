@@ -1,3 +1,4 @@
+from src.use_cases.membership_cache_use_case import admin_cache
 from .base_service import BaseService
 from ..repositories.admin_repository import admin_repository
 
@@ -8,7 +9,7 @@ class AdminService(BaseService):
         return admin is not None
 
     async def exists(self, admin_id: str) -> bool:
-        return await self.repository.exists(id=admin_id)
+        return await admin_cache.get_or_load(admin_id, lambda: self.repository.exists(id=admin_id))
 
 
 admin_service = AdminService(repository=admin_repository)
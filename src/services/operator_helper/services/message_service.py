@@ -8,7 +8,7 @@ from ..schemas.message_schema import MessageCreate, MessageBase
 class MessageService(BaseService):
     async def create_many(self, messages: List[MessageCreate]) -> None:
         if len(messages) != 0:
-            await self.repository.create_many(messages)
+            await self.upsert_many(messages)
 
     async def get_by_chat(self, chat_id: str) -> list[MessageBase] | None:
         return await self.repository.get_by_chat(chat_id=chat_id)
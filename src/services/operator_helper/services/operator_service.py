@@ -1,6 +1,11 @@
+from typing import List
+
+from src.config.database.db_helper import db_helper
+from src.use_cases.membership_cache_use_case import operator_cache
 from .base_service import BaseService
 from ..repositories.operator_repository import operator_repository
 from ..repositories.sqlalchemy_repository import ModelType
+from ..schemas.operator_schema import OperatorCreate
 
 
 class OperatorService(BaseService):
@@ -19,7 +24,25 @@ class OperatorService(BaseService):
         )
 
     async def exists(self, admin_id: str) -> bool:
-        return await self.repository.exists(id=admin_id)
+        return await operator_cache.get_or_load(admin_id, lambda: self.repository.exists(id=admin_id))
+
+    async def create(self, model: OperatorCreate) -> ModelType:
+        operator = await super().create(model)
+        db_helper.after_commit(lambda: operator_cache.invalidate(model.id))
+        return operator
+
+    async def delete(self, pk: str) -> None:
+        await super().delete(pk)
+        db_helper.after_commit(lambda: operator_cache.invalidate(pk))
+
+    async def delete_many(self, pks: List[str], **filters) -> None:
+        await super().delete_many(pks, **filters)
+
+        def invalidate():
+            for pk in pks:
+                operator_cache.invalidate(pk)
+
+        db_helper.after_commit(invalidate)
 
 
 operator_service = OperatorService(repository=operator_repository)
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from redis.asyncio import Redis
+
+from src.logger import logger
+from src.redis_client import redis
+from src.services.admin.schemas.chat_schema import ChatBase
+
+
+@dataclass
+class BroadcastJob:
+    id: str
+    admin_id: int
+    chats: List[ChatBase]
+    text: Optional[str] = None
+    media: List[Dict[str, Optional[str]]] = field(default_factory=list)
+
+
+class BroadcastJobQueue:
+    """
+    Очередь рассылок в Redis.
+
+    broadcast:queue            - id рассылок, ожидающих обработки
+    broadcast:processing       - id рассылок, взятых в работу
+    broadcast:job:<id>         - рассылка (payload, status, cursor - сколько чатов обработано, attempts, error)
+    broadcast:job:<id>:chats   - статус каждого чата: sent / failed
+
+    Рассылки из broadcast:processing после перезапуска продолжаются,
+    чаты с сохраненным статусом повторно не отправляются.
+    Рассылка, прерванная ошибкой, возвращается в конец очереди со статусом failed
+    и продолжается с оставшихся чатов; после max_attempts ошибок она остается в статусе failed.
+    """
+
+    def __init__(self, redis: Redis, prefix: str = 'broadcast', ttl: int = 60 * 60 * 24, max_attempts: int = 3,
+                 retry_delay: float = 5):
+        self.redis = redis
+        self.prefix = prefix
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    @property
+    def queue_key(self) -> str:
+        return f'{self.prefix}:queue'
+
+    @property
+    def processing_key(self) -> str:
+        return f'{self.prefix}:processing'
+
+    def job_key(self, job_id: str) -> str:
+        return f'{self.prefix}:job:{job_id}'
+
+    def chats_key(self, job_id: str) -> str:
+        return f'{self.prefix}:job:{job_id}:chats'
+
+    async def enqueue(self, admin_id: int, chats: List[ChatBase], text: Optional[str] = None,
+                      media: Optional[List[Dict[str, Optional[str]]]] = None) -> BroadcastJob:
+        job = BroadcastJob(id=uuid.uuid4().hex, admin_id=admin_id, chats=chats, text=text, media=media or [])
+        payload = json.dumps({
+            'admin_id': job.admin_id,
+            'chats': [chat.model_dump() for chat in job.chats],
+            'text': job.text,
+            'media': job.media,
+        })
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.job_key(job.id), mapping={'payload': payload, 'status': 'queued', 'cursor': 0})
+            pipe.rpush(self.queue_key, job.id)
+            await pipe.execute()
+        return job
+
+    async def load(self, job_id: str) -> BroadcastJob | None:
+        raw = await self.redis.hget(self.job_key(job_id), 'payload')
+        if raw is None:
+            return None
+        payload = json.loads(raw)
+        return BroadcastJob(
+            id=job_id,
+            admin_id=payload['admin_id'],
+            chats=[ChatBase(**chat) for chat in payload['chats']],
+            text=payload['text'],
+            media=payload['media'],
+        )
+
+    async def processed(self, job: BroadcastJob) -> Dict[str, str]:
+        statuses = await self.redis.hgetall(self.chats_key(job.id))
+        return {key.decode(): value.decode() for key, value in statuses.items()}
+
+    async def mark(self, job: BroadcastJob, chat_id: str, status: str) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.chats_key(job.id), chat_id, status)
+            pipe.hincrby(self.job_key(job.id), 'cursor', 1)
+            await pipe.execute()
+
+    async def finish(self, job: BroadcastJob, status: str = 'done') -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.job_key(job.id), 'status', status)
+            pipe.expire(self.job_key(job.id), self.ttl)
+            pipe.expire(self.chats_key(job.id), self.ttl)
+            pipe.lrem(self.processing_key, 0, job.id)
+            await pipe.execute()
+
+    async def _run(self, job_id: str, run_job: Callable[[BroadcastJob], Awaitable[None]]) -> None:
+        job = await self.load(job_id)
+        if job is None:
+            await self.redis.lrem(self.processing_key, 0, job_id)
+            return
+        await self.redis.hset(self.job_key(job.id), 'status', 'running')
+        try:
+            await run_job(job)
+        except Exception as e:
+            logger.exception('Broadcast job error: %s', job.id)
+            await self.retry(job, str(e))
+        else:
+            await self.finish(job)
+
+    async def retry(self, job: BroadcastJob, error: str) -> None:
+        attempts = await self.redis.hincrby(self.job_key(job.id), 'attempts', 1)
+        await self.redis.hset(self.job_key(job.id), 'error', error)
+        if attempts >= self.max_attempts:
+            logger.error('Broadcast job failed: %s after %s attempts', job.id, attempts)
+            await self.finish(job, 'failed')
+            return
+        await asyncio.sleep(self.retry_delay)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.job_key(job.id), 'status', 'failed')
+            pipe.lrem(self.processing_key, 0, job.id)
+            pipe.rpush(self.queue_key, job.id)
+            await pipe.execute()
+
+    async def _run_safe(self, job_id: str, run_job: Callable[[BroadcastJob], Awaitable[None]]) -> None:
+        # Если недоступен сам Redis, рассылка остается в broadcast:processing до перезапуска
+        try:
+            await self._run(job_id, run_job)
+        except Exception as e:
+            logger.warning('Broadcast queue error: %s: %s', job_id, e)
+            await asyncio.sleep(self.retry_delay)
+
+    async def consume(self, run_job: Callable[[BroadcastJob], Awaitable[None]]) -> None:
+        for job_id in await self.redis.lrange(self.processing_key, 0, -1):
+            await self._run_safe(job_id.decode(), run_job)
+
+        while True:
+            try:
+                job_id = await self.redis.blmove(self.queue_key, self.processing_key, timeout=0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning('Broadcast queue error: %s', e)
+                await asyncio.sleep(5)
+                continue
+            if job_id is not None:
+                await self._run_safe(job_id.decode(), run_job)
+
+
+broadcast_queue = BroadcastJobQueue(redis)
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from src.config.project_config import settings
+from src.logger import logger
+from src.services.admin.schemas.chat_schema import ChatBase
+
+
+class TokenBucket:
+    """Token bucket: `rate` tokens per second, up to `capacity` in reserve"""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """Не выдавать токены ближайшие `seconds` секунд (flood control от Telegram)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """
+        Запрос больше capacity ждет полного резерва и уводит баланс в минус:
+        следующие запросы ждут, пока долг не восполнится
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= min(tokens, self.capacity):
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((min(tokens, self.capacity) - self._tokens) / self.rate)
+
+
+@dataclass
+class BroadcastReport:
+    total: int = 0
+    sent: int = 0
+    failed: List[ChatBase] = field(default_factory=list)
+    # Отправлено в прошлых запусках возобновленной рассылки: входит в итог, но не в скорость
+    previously_sent: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        return self.sent / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f'Отправлено {self.previously_sent + self.sent} из {self.total} за {self.elapsed:.1f} с '
+                f'({self.throughput:.1f} сообщ./с), ошибок: {len(self.failed)}')
+
+
+SendFunc = Callable[[ChatBase], Awaitable[Optional[ChatBase]]]
+
+
+class Broadcaster:
+    """
+    Рассылка по чатам пулом воркеров с соблюдением лимитов Telegram:
+    общий token bucket на бота и отдельный bucket на каждый чат.
+
+    `send` возвращает чат, если отправить не удалось, и None при успехе
+    (как обертки из `except_when_send`). TelegramRetryAfter пробрасывается
+    наружу и приводит к паузе всей рассылки и повторной попытке.
+    `weight` - сколько сообщений Telegram стоит одна отправка (число файлов в альбоме).
+    """
+
+    def __init__(
+            self,
+            workers: int = settings.BROADCAST_WORKERS,
+            rate: float = settings.BROADCAST_RATE,
+            chat_rate: float = settings.BROADCAST_CHAT_RATE,
+            max_retries: int = 3,
+    ):
+        self.workers = workers
+        self.global_bucket = TokenBucket(rate)
+        self.chat_rate = chat_rate
+        self.chat_buckets: Dict[str, TokenBucket] = {}
+        self.max_retries = max_retries
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, capacity=1)
+        return bucket
+
+    async def _send_one(self, chat: ChatBase, send: SendFunc, weight: int) -> bool:
+        for _ in range(self.max_retries + 1):
+            await self._chat_bucket(chat.id).acquire(weight)
+            await self.global_bucket.acquire(weight)
+            try:
+                return await send(chat) is None
+            except TelegramRetryAfter as e:
+                self.global_bucket.pause(e.retry_after)
+        return False
+
+    async def _worker(self, queue: asyncio.Queue, send: SendFunc, weight: int, report: BroadcastReport):
+        while True:
+            chat = await queue.get()
+            try:
+                if await self._send_one(chat, send, weight):
+                    report.sent += 1
+                else:
+                    report.failed.append(chat)
+            except Exception as e:
+                logger.warning('Broadcast error: %s %s: %s', chat.id, chat.name, e)
+                report.failed.append(chat)
+            finally:
+                queue.task_done()
+
+    async def run(self, chats: Iterable[ChatBase], send: SendFunc, weight: int = 1) -> BroadcastReport:
+        queue: asyncio.Queue = asyncio.Queue()
+        for chat in chats:
+            queue.put_nowait(chat)
+        report = BroadcastReport(total=queue.qsize())
+
+        tasks = [asyncio.create_task(self._worker(queue, send, weight, report))
+                 for _ in range(min(self.workers, report.total))]
+        try:
+            await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        report.finished_at = time.monotonic()
+        return report
@@ -0,0 +1,76 @@
+import asyncio
+import json
+from typing import Callable, Dict, Set
+
+from redis.asyncio import Redis
+
+from src.config.project_config import settings
+from src.logger import logger
+from src.redis_client import redis
+
+
+class CacheInvalidation:
+    """
+    Инвалидация кэшей в памяти процесса между репликами через Redis pub/sub.
+
+    Кэш регистрирует обработчик под своим именем. publish() рассылает (cache, key) остальным
+    репликам, listen() вызывает обработчики для чужих сообщений; key None - сбросить кэш целиком.
+    Сообщения, пропущенные при обрыве подписки, не восстанавливаются: после переподключения
+    все кэши сбрасываются, а в остальное время устаревание ограничено TTL самих кэшей.
+    """
+
+    def __init__(self, redis: Redis, replica_id: str, enabled: bool, channel: str = 'cache:invalidate'):
+        self.redis = redis
+        self.replica_id = replica_id
+        self.enabled = enabled
+        self.channel = channel
+        self._handlers: Dict[str, Callable[[str | None], None]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def register(self, name: str, handler: Callable[[str | None], None]) -> None:
+        self._handlers[name] = handler
+
+    def publish(self, name: str, key: str | None = None) -> None:
+        """Не ждет Redis: вызывается из синхронных методов кэшей"""
+        if not self.enabled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._publish(name, key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, name: str, key: str | None) -> None:
+        message = json.dumps({'replica': self.replica_id, 'cache': name, 'key': key})
+        try:
+            await self.redis.publish(self.channel, message)
+        except Exception as e:
+            logger.warning('Cache invalidation publish error: %s %s: %s', name, key, e)
+
+    def _invalidate_all(self) -> None:
+        for handler in self._handlers.values():
+            handler(None)
+
+    async def listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    self._invalidate_all()
+                    async for message in pubsub.listen():
+                        if message['type'] != 'message':
+                            continue
+                        data = json.loads(message['data'])
+                        handler = self._handlers.get(data['cache'])
+                        if data['replica'] != self.replica_id and handler is not None:
+                            handler(data['key'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning('Cache invalidation subscription error: %s', e)
+                await asyncio.sleep(5)
+
+
+cache_invalidation = CacheInvalidation(redis, replica_id=settings.REPLICA_ID, enabled=settings.CLUSTER_ENABLED)
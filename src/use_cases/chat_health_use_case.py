@@ -0,0 +1,110 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramMigrateToChat
+
+from src.config.project_config import settings
+from src.logger import logger
+from src.services.admin.schemas.chat_schema import ChatBase
+from src.use_cases.broadcast_use_case import Broadcaster
+from src.use_cases.membership_cache_use_case import chat_exist_cache
+
+
+@dataclass
+class ChatHealthReport:
+    checked: int = 0
+    elapsed: float = 0.0
+    migrated: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    renamed: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.migrated or self.removed or self.renamed or self.failed)
+
+    def lines(self) -> List[str]:
+        lines = [f'Проверка чатов: {self.checked} за {self.elapsed:.1f} с']
+        for title, names in (
+                ('Перенесены в супергруппы', self.migrated),
+                ('Удалены (бот исключен или чат не найден)', self.removed),
+                ('Обновлены названия', self.renamed),
+                ('Не удалось проверить', self.failed),
+        ):
+            if names:
+                lines.append(f'\n{title}: {len(names)}')
+                lines.extend(names)
+        return lines
+
+
+class ChatHealthSweeper:
+    """
+    Периодически проверяет все чаты из таблицы chats через bot.get_chat:
+    переносит мигрировавшие группы, удаляет чаты, из которых бота исключили,
+    и обновляет названия. Запросы идут пулом воркеров с лимитом Broadcaster.
+    """
+
+    def __init__(self, bot: Bot, chat_service, interval: float = settings.CHAT_SWEEP_INTERVAL,
+                 workers: int = settings.CHAT_SWEEP_WORKERS, rate: float = settings.CHAT_SWEEP_RATE):
+        self.bot = bot
+        self.chat_service = chat_service
+        self.interval = interval
+        self.workers = workers
+        self.rate = rate
+
+    async def _check(self, chat: ChatBase, report: ChatHealthReport) -> ChatBase | None:
+        try:
+            info = await self.bot.get_chat(chat.id)
+        except TelegramMigrateToChat as e:
+            await self.chat_service.migrate(chat.id, str(e.migrate_to_chat_id), chat.name)
+            chat_exist_cache.invalidate(chat.id)
+            report.migrated.append(chat.name)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            if isinstance(e, TelegramBadRequest) and 'chat not found' not in str(e).lower():
+                raise
+            await self.chat_service.delete(chat.id)
+            chat_exist_cache.invalidate(chat.id)
+            report.removed.append(chat.name)
+        else:
+            chat_exist_cache.set(chat.id, True)
+            if info.full_name and info.full_name != chat.name:
+                await self.chat_service.update(chat.id, ChatBase(id=chat.id, name=info.full_name))
+                report.renamed.append(f'{chat.name} -> {info.full_name}')
+        return None
+
+    async def sweep(self) -> ChatHealthReport:
+        chats = await self.chat_service.filter(limit=None, order=['name'])
+        report = ChatHealthReport(checked=len(chats or []))
+
+        async def check(chat: ChatBase) -> ChatBase | None:
+            try:
+                return await self._check(chat, report)
+            except TelegramBadRequest as e:
+                logger.warning('Chat health check error: %s %s: %s', chat.id, chat.name, e)
+                return chat
+
+        result = await Broadcaster(workers=self.workers, rate=self.rate, chat_rate=self.rate).run(
+            [ChatBase(id=chat.id, name=chat.name) for chat in chats or []], check,
+        )
+        report.failed = [chat.name for chat in result.failed]
+        report.elapsed = result.elapsed
+        return report
+
+    async def run(self, notify: Callable[[ChatHealthReport], Awaitable[None]]) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                report = await self.sweep()
+                logger.info('Chat health sweep finished', extra={'fields': {
+                    'checked': report.checked, 'migrated': len(report.migrated),
+                    'removed': len(report.removed), 'renamed': len(report.renamed),
+                    'failed': len(report.failed),
+                }})
+                if report.changed:
+                    await notify(report)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Chat health sweep error')
@@ -1,26 +1,53 @@
-from typing import List
-
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+import time
+from typing import Awaitable, Callable, List, Tuple
 
+from src.config.project_config import settings
 from src.services.admin.schemas.chat_schema import ChatBase
+from src.use_cases.cache_invalidation_use_case import cache_invalidation
+
+
+async def _load_chats() -> List[ChatBase]:
+    from src.services.admin.services.chat_service import chat_service
+
+    chats = await chat_service.filter(limit=1000, order=['name'])
+    return [ChatBase(id=chat.id, name=chat.name) for chat in chats or []]
+
+
+class ChatDirectory:
+    """
+    Отсортированный список чатов для рассылок и клавиатур выбора чата.
+    Кэш сбрасывается увеличением версии при любом изменении таблицы chats
+    (bump рассылается остальным репликам) и перечитывается не реже раза в ttl секунд.
+    """
+
+    def __init__(self, load: Callable[[], Awaitable[List[ChatBase]]] = _load_chats,
+                 ttl: float = settings.CHAT_DIRECTORY_TTL):
+        self._load = load
+        self.ttl = ttl
+        self.version = 0
+        self._chats: Tuple[int, float, List[ChatBase]] | None = None
+        cache_invalidation.register('chat_directory', lambda key: self._bump_local())
+
+    def _bump_local(self) -> None:
+        self.version += 1
 
+    def bump(self) -> None:
+        self._bump_local()
+        cache_invalidation.publish('chat_directory')
 
-def chunks(lst, chunk_size):
-    for i in range(0, len(lst), chunk_size):
-        yield lst[i:i + chunk_size]
+    async def _cached(self) -> List[ChatBase]:
+        if self._chats is None or self._chats[0] != self.version or self._chats[1] < time.monotonic():
+            version = self.version
+            self._chats = (version, time.monotonic() + self.ttl, await self._load())
+        return self._chats[2]
 
+    async def chats(self) -> List[ChatBase]:
+        """Копии чатов: вызывающий код может менять их (например, id после миграции группы)"""
+        return [chat.model_copy() for chat in await self._cached()]
 
-def get_chat_keyboards(chats: List[ChatBase], command_num: str) -> List[InlineKeyboardMarkup]:
-    kbs = []
+    async def page(self, offset: int, limit: int) -> List[ChatBase]:
+        """Страница для Paginator: срез закэшированного списка, без запроса в БД"""
+        return [chat.model_copy() for chat in (await self._cached())[offset:offset + limit]]
 
-    if chats is None:
-        chats = []
 
-    for chat_group in list(chunks(chats, 100)):
-        kb = []
-        for i in chat_group:
-            kb.append(
-                [InlineKeyboardButton(text=i.name,
-                                      callback_data=f'{command_num}|{i.id}|0')])
-        kbs.append(InlineKeyboardMarkup(inline_keyboard=kb))
-    return kbs
+chat_directory = ChatDirectory()
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import math
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+from aiogram.types import Update
+from redis.asyncio import Redis
+
+from src.config.project_config import settings
+from src.logger import logger
+from src.redis_client import redis
+
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLease:
+    """Аренда ключа в Redis: владеть ею может только одна реплика, пока продлевает ее"""
+
+    def __init__(self, redis: Redis, key: str, owner: str, ttl: float):
+        self.redis = redis
+        self.key = key
+        self.owner = owner
+        self.ttl = ttl
+
+    async def acquire(self) -> bool:
+        if await self.redis.set(self.key, self.owner, nx=True, px=int(self.ttl * 1000)):
+            return True
+        return await self.renew()
+
+    async def renew(self) -> bool:
+        return bool(await self.redis.eval(RENEW_SCRIPT, 1, self.key, self.owner, int(self.ttl * 1000)))
+
+    async def release(self) -> None:
+        await self.redis.eval(RELEASE_SCRIPT, 1, self.key, self.owner)
+
+
+class Cluster:
+    """
+    Координация реплик через Redis.
+
+    cluster:replica:<id>   - heartbeat живой реплики
+    cluster:lease:<name>   - аренда задачи, которую должна выполнять одна реплика
+    """
+
+    def __init__(self, redis: Redis, replica_id: str, ttl: float, prefix: str = 'cluster'):
+        self.redis = redis
+        self.replica_id = replica_id
+        self.ttl = ttl
+        self.prefix = prefix
+        self.balanced: Set[str] = set()
+
+    def lease(self, name: str) -> RedisLease:
+        return RedisLease(self.redis, f'{self.prefix}:lease:{name}', self.replica_id, self.ttl)
+
+    async def heartbeat(self) -> None:
+        key = f'{self.prefix}:replica:{self.replica_id}'
+        while True:
+            try:
+                await self.redis.set(key, 1, px=int(self.ttl * 1000))
+            except Exception as e:
+                logger.warning('Cluster heartbeat error: %s', e)
+            await asyncio.sleep(self.ttl / 3)
+
+    async def replicas(self) -> int:
+        count = 0
+        async for _ in self.redis.scan_iter(match=f'{self.prefix}:replica:*'):
+            count += 1
+        return max(count, 1)
+
+    async def _fair_share(self, total: int) -> int:
+        return math.ceil(total / await self.replicas())
+
+    async def run_exclusive(self, name: str, factory: Callable[[], Awaitable[Any]],
+                            balance_total: int | None = None) -> None:
+        """
+        Выполняет factory(), пока реплика держит аренду `name`.
+        При потере аренды задача отменяется, и реплика снова ждет своей очереди.
+        С balance_total реплика держит не больше своей доли из balance_total аренд.
+        """
+        lease = self.lease(name)
+        interval = self.ttl / 3
+        while True:
+            try:
+                if balance_total is not None and len(self.balanced) >= await self._fair_share(balance_total):
+                    await asyncio.sleep(interval)
+                    continue
+                if not await lease.acquire():
+                    await asyncio.sleep(interval)
+                    continue
+            except Exception as e:
+                logger.warning('Cluster lease error: %s %s', name, e)
+                await asyncio.sleep(interval)
+                continue
+
+            if balance_total is not None:
+                self.balanced.add(name)
+            task = asyncio.create_task(factory())
+            try:
+                while not task.done():
+                    await asyncio.wait({task}, timeout=interval)
+                    if task.done():
+                        break
+                    try:
+                        keep = await lease.renew()
+                        if keep and balance_total is not None:
+                            share = await self._fair_share(balance_total)
+                            keep = len(self.balanced) <= share
+                            if not keep:
+                                self.balanced.discard(name)
+                    except Exception as e:
+                        logger.warning('Cluster lease error: %s %s', name, e)
+                        keep = False
+                    if not keep:
+                        task.cancel()
+                        break
+                await asyncio.gather(task, return_exceptions=True)
+            finally:
+                if not task.done():
+                    task.cancel()
+                self.balanced.discard(name)
+                try:
+                    await lease.release()
+                except Exception as e:
+                    logger.warning('Cluster lease error: %s %s', name, e)
+            await asyncio.sleep(interval)
+
+
+def get_update_chat_id(update: Update) -> int:
+    event = update.event
+    chat = getattr(event, 'chat', None)
+    if chat is None and getattr(event, 'message', None) is not None:
+        chat = event.message.chat
+    if chat is not None:
+        return chat.id
+    user = getattr(event, 'from_user', None)
+    if user is not None:
+        return user.id
+    return update.update_id
+
+
+@dataclass
+class _ChatUpdates:
+    last: asyncio.Task | None = None
+    album_parts: Set[asyncio.Task] = field(default_factory=set)
+
+
+class UpdatePartitions:
+    """
+    Обновления из вебхуков раскладываются по спискам updates:<n> по chat id.
+    Каждый список читает одна реплика, арендовавшая его. Обновления одного чата обрабатываются
+    по очереди: следующее начинается после завершения предыдущего. Исключение - части альбомов:
+    они ждут только предыдущее обычное обновление и обрабатываются параллельно друг с другом,
+    иначе AlbumMiddleware не дождется остальных частей. Разные чаты обрабатываются параллельно.
+
+    updates:<n>                        - обновления, ожидающие обработки
+    updates:<n>:processing:<replica>   - взятые репликой и еще не обработанные
+
+    Реплика, взявшая аренду, возвращает в очередь обновления из processing-списков прежних владельцев.
+    """
+
+    def __init__(self, cluster: Cluster, partitions: int, prefix: str = 'updates'):
+        self.cluster = cluster
+        self.partitions = partitions
+        self.prefix = prefix
+
+    def key(self, partition: int) -> str:
+        return f'{self.prefix}:{partition}'
+
+    def processing_key(self, partition: int, replica_id: str | None = None) -> str:
+        return f'{self.key(partition)}:processing:{replica_id or self.cluster.replica_id}'
+
+    async def publish(self, bot_name: str, update: Update) -> None:
+        chat_id = get_update_chat_id(update)
+        payload = json.dumps({
+            'bot': bot_name,
+            'chat': chat_id,
+            'album': getattr(update.event, 'media_group_id', None) is not None,
+            'update': update.model_dump(mode='json', exclude_unset=True, by_alias=True),
+        })
+        partition = chat_id % self.partitions
+        await self.cluster.redis.rpush(self.key(partition), payload)
+
+    async def _requeue_processing(self, partition: int) -> None:
+        """Возвращает в начало очереди обновления, взятые прежними владельцами партиции"""
+        redis = self.cluster.redis
+        async for processing_key in redis.scan_iter(match=self.processing_key(partition, '*')):
+            requeued = 0
+            while await redis.lmove(processing_key, self.key(partition), 'RIGHT', 'LEFT') is not None:
+                requeued += 1
+            if requeued:
+                logger.warning('Requeued %s updates from %s', requeued, processing_key.decode())
+
+    async def _handle(self, partition: int, handle: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+                      item: bytes, payload: Dict[str, Any], previous: List[asyncio.Task]) -> None:
+        if previous:
+            await asyncio.wait(previous)
+        try:
+            await handle(payload['bot'], payload['update'])
+        except Exception:
+            logger.exception('Update handling error: partition %s', partition)
+        await self.cluster.redis.lrem(self.processing_key(partition), 1, item)
+
+    async def _consume(self, partition: int,
+                       handle: Callable[[str, Dict[str, Any]], Awaitable[Any]]) -> None:
+        await self._requeue_processing(partition)
+        tasks: Set[asyncio.Task] = set()
+        chats: Dict[int, _ChatUpdates] = {}
+
+        def release(chat_id: int, task: asyncio.Task) -> None:
+            tasks.discard(task)
+            chat = chats.get(chat_id)
+            if chat is None:
+                return
+            if chat.last is task:
+                chat.last = None
+            chat.album_parts.discard(task)
+            if chat.last is None and not chat.album_parts:
+                del chats[chat_id]
+
+        try:
+            while True:
+                item = await self.cluster.redis.blmove(self.key(partition), self.processing_key(partition), timeout=0)
+                if item is None:
+                    continue
+                try:
+                    payload = json.loads(item)
+                except ValueError:
+                    logger.exception('Malformed update: partition %s', partition)
+                    await self.cluster.redis.lrem(self.processing_key(partition), 1, item)
+                    continue
+
+                chat_id = payload.get('chat')
+                chat = chats.setdefault(chat_id, _ChatUpdates()) if chat_id is not None else _ChatUpdates()
+                previous = [chat.last] if chat.last is not None else []
+                if not payload.get('album'):
+                    previous.extend(chat.album_parts)
+                task = asyncio.create_task(self._handle(partition, handle, item, payload, previous))
+                if payload.get('album'):
+                    chat.album_parts.add(task)
+                else:
+                    chat.last, chat.album_parts = task, set()
+                tasks.add(task)
+                task.add_done_callback(lambda task, chat_id=chat_id: release(chat_id, task))
+        finally:
+            # Аренда уходит другой реплике: незавершенные обновления остаются в processing
+            # и будут обработаны ею заново, параллельно с ней здесь ничего не выполняется
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self, handle: Callable[[str, Dict[str, Any]], Awaitable[Any]]) -> None:
+        await asyncio.gather(*(
+            self.cluster.run_exclusive(
+                f'partition:{partition}',
+                lambda partition=partition: self._consume(partition, handle),
+                balance_total=self.partitions,
+            )
+            for partition in range(self.partitions)
+        ))
+
+
+cluster = Cluster(redis, replica_id=settings.REPLICA_ID, ttl=settings.CLUSTER_LEASE_TTL)
+update_partitions = UpdatePartitions(cluster, partitions=settings.CLUSTER_PARTITIONS)
@@ -0,0 +1,52 @@
+import json
+from typing import Dict, List, Optional
+
+from aiogram.types import Message
+from redis.asyncio import Redis
+
+from src.config.project_config import settings
+from src.redis_client import redis
+
+
+def get_file_id(message: Message) -> str | None:
+    for media in (message.voice, message.audio, message.document, message.video, message.animation):
+        if media is not None:
+            return media.file_id
+    if message.photo:
+        return message.photo[-1].file_id
+    return None
+
+
+class FileIdCache:
+    """
+    Короткоживущий кэш "ключ S3 -> file_id Telegram", чтобы повторно
+    отправленный лид не загружал файлы заново. ttl=0 отключает кэш.
+    """
+
+    def __init__(self, redis: Redis, ttl: int, prefix: str = 'file_id'):
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def key(self, s3_key: str) -> str:
+        return f'{self.prefix}:{s3_key}'
+
+    async def get_many(self, s3_keys: List[str]) -> Optional[List[Dict[str, str]]]:
+        """Возвращает file_id и имена для всех ключей или None, если хотя бы одного нет в кэше"""
+        if not self.ttl or not s3_keys:
+            return None
+        values = await self.redis.mget([self.key(s3_key) for s3_key in s3_keys])
+        if any(value is None for value in values):
+            return None
+        return [json.loads(value) for value in values]
+
+    async def set_many(self, s3_keys: List[str], file_ids: List[str], filenames: List[str]) -> None:
+        if not self.ttl:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for s3_key, file_id, filename in zip(s3_keys, file_ids, filenames):
+                pipe.set(self.key(s3_key), json.dumps({'file_id': file_id, 'filename': filename}), ex=self.ttl)
+            await pipe.execute()
+
+
+file_id_cache = FileIdCache(redis, ttl=settings.FILE_ID_CACHE_TTL)
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram.exceptions import TelegramRetryAfter
+from redis.asyncio import Redis
+
+from src.config.project_config import settings
+from src.logger import logger
+from src.redis_client import redis
+
+PROMOTE_SCRIPT = """
+local ids = redis.call('zrangebyscore', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, id in ipairs(ids) do
+    redis.call('zrem', KEYS[1], id)
+    redis.call('rpush', KEYS[2], id)
+end
+return #ids
+"""
+
+
+class LeadSteps:
+    """
+    Шаги доставки лида, выполненные в прошлых попытках (поля step:<name> в lead:<id>).
+    Повторная попытка пропускает их и получает сохраненный результат шага,
+    поэтому сообщения, уже отправленные пользователю или в группу, не дублируются.
+    Без redis шаги учитываются только в памяти (доставка без очереди).
+    """
+
+    def __init__(self, redis: Redis | None = None, key: str | None = None, done: Dict[str, str] | None = None):
+        self.redis = redis
+        self.key = key
+        self.done = done or {}
+
+    async def run(self, name: str, action: Callable[[], Awaitable[Any]]) -> str | None:
+        if name in self.done:
+            return self.done[name]
+        result = await action()
+        value = result if isinstance(result, str) else ''
+        if self.redis is not None:
+            await self.redis.hset(self.key, f'step:{name}', value)
+        self.done[name] = value
+        return value
+
+
+class LeadQueue:
+    """
+    Очередь доставки лидов из /selectGroup в Redis.
+
+    lead:queue        - id лидов, ожидающих доставки
+    lead:delayed      - zset id лидов, ожидающих повторной попытки, score - время попытки
+    lead:processing:<consumer> - id лидов, взятых воркерами реплики
+    lead:<id>         - payload, status (queued / processing / retrying / delivered / failed), attempts, error,
+                        step:<name> - выполненные шаги доставки (LeadSteps)
+
+    Повторная попытка откладывается экспоненциально (retry_delay * 2^(attempts-1), не больше max_retry_delay),
+    при флуд-контроле Telegram - на retry_after, такая попытка не расходует attempts.
+    Лиды, оставшиеся в lead:processing:<consumer> после перезапуска реплики, возвращаются в очередь.
+    """
+
+    def __init__(self, redis: Redis, consumer: str, prefix: str = 'lead', max_attempts: int = 3,
+                 ttl: int = 60 * 60 * 24, retry_delay: float = 5, max_retry_delay: float = 300):
+        self.redis = redis
+        self.consumer = consumer
+        self.prefix = prefix
+        self.max_attempts = max_attempts
+        self.ttl = ttl
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+    @property
+    def queue_key(self) -> str:
+        return f'{self.prefix}:queue'
+
+    @property
+    def delayed_key(self) -> str:
+        return f'{self.prefix}:delayed'
+
+    @property
+    def processing_key(self) -> str:
+        return f'{self.prefix}:processing:{self.consumer}'
+
+    def lead_key(self, lead_id: str) -> str:
+        return f'{self.prefix}:{lead_id}'
+
+    async def enqueue(self, payload: Dict[str, Any]) -> str:
+        lead_id = uuid.uuid4().hex
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.lead_key(lead_id), mapping={'payload': json.dumps(payload), 'status': 'queued',
+                                                       'attempts': 0})
+            pipe.rpush(self.queue_key, lead_id)
+            await pipe.execute()
+        return lead_id
+
+    async def status(self, lead_id: str) -> Dict[str, Any] | None:
+        data = await self.redis.hmget(self.lead_key(lead_id), 'status', 'attempts', 'error')
+        status, attempts, error = data
+        if status is None:
+            return None
+        return {
+            'lead_id': lead_id,
+            'status': status.decode(),
+            'attempts': int(attempts or 0),
+            'error': error.decode() if error else None,
+        }
+
+    async def _set_status(self, lead_id: str, status: str, error: str | None = None) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.lead_key(lead_id), 'status', status)
+            if error is not None:
+                pipe.hset(self.lead_key(lead_id), 'error', error)
+            pipe.expire(self.lead_key(lead_id), self.ttl)
+            pipe.lrem(self.processing_key, 0, lead_id)
+            await pipe.execute()
+
+    async def _retry_later(self, lead_id: str, delay: float, error: str) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.lead_key(lead_id), mapping={'status': 'retrying', 'error': error})
+            pipe.zadd(self.delayed_key, {lead_id: time.time() + delay})
+            pipe.lrem(self.processing_key, 0, lead_id)
+            await pipe.execute()
+
+    async def _process(self, lead_id: str, deliver: Callable[[Dict[str, Any], LeadSteps], Awaitable[None]]) -> None:
+        data = await self.redis.hgetall(self.lead_key(lead_id))
+        raw = data.get(b'payload')
+        if raw is None:
+            await self.redis.lrem(self.processing_key, 0, lead_id)
+            return
+        steps = LeadSteps(self.redis, self.lead_key(lead_id), {
+            key.decode()[len('step:'):]: value.decode() for key, value in data.items() if key.startswith(b'step:')
+        })
+        attempts = await self.redis.hincrby(self.lead_key(lead_id), 'attempts', 1)
+        await self.redis.hset(self.lead_key(lead_id), 'status', 'processing')
+        try:
+            await deliver(json.loads(raw), steps)
+        except TelegramRetryAfter as e:
+            logger.warning('Lead delivery flood control: %s: retry after %s', lead_id, e.retry_after)
+            await self.redis.hincrby(self.lead_key(lead_id), 'attempts', -1)
+            await self._retry_later(lead_id, e.retry_after, str(e))
+        except Exception as e:
+            logger.warning('Lead delivery error: %s: %s', lead_id, e)
+            if attempts < self.max_attempts:
+                await self._retry_later(
+                    lead_id, min(self.retry_delay * 2 ** (attempts - 1), self.max_retry_delay), str(e),
+                )
+            else:
+                await self._set_status(lead_id, 'failed', str(e))
+        else:
+            await self._set_status(lead_id, 'delivered')
+
+    async def _process_safe(self, lead_id: str,
+                            deliver: Callable[[Dict[str, Any], LeadSteps], Awaitable[None]]) -> None:
+        # Если недоступен сам Redis, лид остается в lead:processing до перезапуска реплики
+        try:
+            await self._process(lead_id, deliver)
+        except Exception as e:
+            logger.warning('Lead queue error: %s: %s', lead_id, e)
+            await asyncio.sleep(5)
+
+    async def _promote_delayed(self, interval: float = 1) -> None:
+        """Возвращает в очередь лиды, время повторной попытки которых наступило"""
+        while True:
+            try:
+                await self.redis.eval(PROMOTE_SCRIPT, 2, self.delayed_key, self.queue_key, time.time())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning('Lead queue error: %s', e)
+            await asyncio.sleep(interval)
+
+    async def _worker(self, deliver: Callable[[Dict[str, Any], LeadSteps], Awaitable[None]]) -> None:
+        while True:
+            try:
+                lead_id = await self.redis.blmove(self.queue_key, self.processing_key, timeout=0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning('Lead queue error: %s', e)
+                await asyncio.sleep(5)
+                continue
+            if lead_id is not None:
+                await self._process_safe(lead_id.decode(), deliver)
+
+    async def consume(self, deliver: Callable[[Dict[str, Any], LeadSteps], Awaitable[None]], workers: int) -> None:
+        while await self.redis.lmove(self.processing_key, self.queue_key, 'RIGHT', 'LEFT') is not None:
+            pass
+        await asyncio.gather(self._promote_delayed(), *(self._worker(deliver) for _ in range(workers)))
+
+
+lead_queue = LeadQueue(redis, consumer=settings.REPLICA_ID, max_attempts=settings.LEAD_MAX_ATTEMPTS,
+                       retry_delay=settings.LEAD_RETRY_DELAY)
@@ -0,0 +1,86 @@
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Tuple
+
+from src.config.project_config import settings
+from src.use_cases.cache_invalidation_use_case import cache_invalidation
+
+
+class MembershipCache:
+    """
+    Кэш проверок вида "пользователь - админ/оператор" или "чат существует" в памяти процесса.
+    Положительный и отрицательный ответы хранятся с разным TTL.
+    Истекшие записи вычищаются в set не чаще раза в negative_ttl,
+    сверх max_size вытесняются давно не читавшиеся.
+    Кэш с именем name рассылает invalidate() остальным репликам.
+    """
+
+    def __init__(self, ttl: float = settings.MEMBERSHIP_CACHE_TTL,
+                 negative_ttl: float = settings.MEMBERSHIP_CACHE_NEGATIVE_TTL,
+                 max_size: int = settings.MEMBERSHIP_CACHE_MAX_SIZE, name: str | None = None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._data: OrderedDict[str, Tuple[bool, float]] = OrderedDict()
+        self._purged_at = time.monotonic()
+        self.name = name
+        if name is not None:
+            cache_invalidation.register(name, self._invalidate_local)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, user_id: str) -> bool | None:
+        cached = self._data.get(user_id)
+        if cached is None:
+            return None
+        value, expires_at = cached
+        if expires_at < time.monotonic():
+            del self._data[user_id]
+            return None
+        self._data.move_to_end(user_id)
+        return value
+
+    def purge(self) -> None:
+        now = self._purged_at = time.monotonic()
+        for user_id in [user_id for user_id, (_, expires_at) in self._data.items() if expires_at < now]:
+            del self._data[user_id]
+
+    def set(self, user_id: str, value: bool) -> None:
+        now = time.monotonic()
+        if now - self._purged_at >= self.negative_ttl:
+            self.purge()
+        self._data[user_id] = (value, now + (self.ttl if value else self.negative_ttl))
+        self._data.move_to_end(user_id)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def _invalidate_local(self, user_id: str | None = None) -> None:
+        if user_id is None:
+            self._data.clear()
+        else:
+            self._data.pop(user_id, None)
+
+    def invalidate(self, user_id: str | None = None) -> None:
+        self._invalidate_local(user_id)
+        if self.name is not None:
+            cache_invalidation.publish(self.name, user_id)
+
+    async def get_or_load(self, user_id: str, load: Callable[[], Awaitable[bool]]) -> bool:
+        value = self.get(user_id)
+        if value is None:
+            value = await load()
+            self.set(user_id, value)
+        return value
+
+
+admin_cache = MembershipCache(name='admin')
+operator_cache = MembershipCache(name='operator')
+# Результаты bot.get_chat для чатов, в которые отправляются лиды и рассылки
+chat_exist_cache = MembershipCache(ttl=settings.CHAT_EXIST_CACHE_TTL,
+                                   negative_ttl=settings.CHAT_EXIST_CACHE_NEGATIVE_TTL, name='chat_exist')
+
+
+def invalidate_chat_on_error(chat_id: str, error: Exception) -> None:
+    if 'chat not found' in str(error).lower():
+        chat_exist_cache.invalidate(str(chat_id))
@@ -0,0 +1,89 @@
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, List, Sequence, TypeVar
+
+from aiogram import F
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
+
+T = TypeVar('T')
+
+PAGE_SIZE = 20
+
+
+@dataclass
+class Page(Generic[T]):
+    items: List[T]
+    offset: int
+    has_next: bool
+
+
+class Paginator(Generic[T]):
+    """
+    Инлайн клавиатура со списком, который листается кнопками < и >.
+    Загружается только текущая страница: fetch(offset, limit, **params) запрашивает
+    на одну строку больше, чтобы узнать о следующей. При листании сообщение редактируется на месте.
+
+    Callback кнопок листания: p|<name>|<offset>. Кнопка элемента строится через button(item, offset),
+    offset в ее callback нужен, чтобы после действия с элементом перерисовать ту же страницу.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            fetch: Callable[..., Awaitable[Sequence[T] | None]],
+            button: Callable[[T, int], InlineKeyboardButton],
+            page_size: int = PAGE_SIZE,
+            footer: List[List[InlineKeyboardButton]] | None = None,
+    ):
+        self.name = name
+        self.fetch = fetch
+        self.button = button
+        self.page_size = page_size
+        self.footer = footer or []
+
+    def filter(self):
+        return F.data.startswith(f'p|{self.name}|')
+
+    @staticmethod
+    def offset(data: str) -> int:
+        return int(data.split('|')[2])
+
+    async def page(self, offset: int = 0, **params) -> Page[T]:
+        offset = max(offset, 0)
+        items = list(await self.fetch(offset, self.page_size + 1, **params) or [])
+        # Последнюю страницу могли опустошить удалением - показываем предыдущую
+        while offset > 0 and not items:
+            offset = max(offset - self.page_size, 0)
+            items = list(await self.fetch(offset, self.page_size + 1, **params) or [])
+        return Page(items=items[:self.page_size], offset=offset, has_next=len(items) > self.page_size)
+
+    def markup(self, page: Page[T]) -> InlineKeyboardMarkup:
+        kb = [[self.button(item, page.offset)] for item in page.items]
+        navigation = []
+        if page.offset > 0:
+            navigation.append(InlineKeyboardButton(
+                text='<', callback_data=f'p|{self.name}|{max(page.offset - self.page_size, 0)}'))
+        if page.has_next:
+            navigation.append(InlineKeyboardButton(
+                text='>', callback_data=f'p|{self.name}|{page.offset + self.page_size}'))
+        if navigation:
+            kb.append(navigation)
+        kb.extend(self.footer)
+        return InlineKeyboardMarkup(inline_keyboard=kb)
+
+    async def keyboard(self, offset: int = 0, **params) -> InlineKeyboardMarkup:
+        return self.markup(await self.page(offset, **params))
+
+    async def edit(self, call: CallbackQuery, offset: int | None = None, text: str | None = None,
+                   **params) -> None:
+        """Перерисовывает страницу в сообщении с кнопкой. Без offset он берется из callback листания"""
+        if offset is None:
+            offset = self.offset(call.data)
+        kb = await self.keyboard(offset, **params)
+        # "message is not modified" при повторном нажатии
+        with suppress(TelegramBadRequest):
+            if text is None:
+                await call.message.edit_reply_markup(reply_markup=kb)
+            else:
+                await call.message.edit_text(text, reply_markup=kb)
@@ -0,0 +1,47 @@
+import re
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple
+
+import phonenumbers
+from phonenumbers import NumberParseException
+
+# +7/8/7, необязательный разделитель и 10 цифр номера, не внутри более длинного числа
+PHONE_PATTERN = re.compile(r'(?<!\d)(?:\+7|8|7)[\- ]?(\d{10})(?!\d)')
+
+
+class Phone(NamedTuple):
+    international: str
+    e164: str
+    key: str
+
+
+@lru_cache(maxsize=4096)
+def normalize_phone(phone: str, region: str = "RU") -> Phone | None:
+    """Разбирает номер через phonenumbers, результат кэшируется. None - номер некорректен"""
+    try:
+        pn = phonenumbers.parse(phone, region)
+    except NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(pn):
+        return None
+    return Phone(
+        international=phonenumbers.format_number(pn, phonenumbers.PhoneNumberFormat.INTERNATIONAL),
+        e164=phonenumbers.format_number(pn, phonenumbers.PhoneNumberFormat.E164),
+        key=str(pn.national_number),
+    )
+
+
+def validate_phone(phone: str, region: str = "RU") -> str | None:
+    normalized = normalize_phone(phone.strip(), region)
+    return normalized.international if normalized else None
+
+
+def extract_phone_keys(text: str | None) -> List[str]:
+    """10-значные ключи номеров из текста (как в messages.phone), без повторов, в порядке появления"""
+    if not text:
+        return []
+    return list(dict.fromkeys(PHONE_PATTERN.findall(text)))
+
+
+def extract_phone_keys_batch(texts: Iterable[str | None]) -> List[List[str]]:
+    return [extract_phone_keys(text) for text in texts]
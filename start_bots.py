@@ -1,33 +1,74 @@
 import asyncio
-import os
+import json
+import time
 
 import uvicorn
-from aiogram import Dispatcher
+from aiogram import Bot, Dispatcher
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.storage.base import DefaultKeyBuilder
 from aiogram.fsm.storage.redis import RedisStorage
-from aiogram.types import InputMediaDocument, FSInputFile, InlineKeyboardMarkup, WebAppInfo, InlineKeyboardButton
-from fastapi import FastAPI, HTTPException, Header, Depends
+from aiogram.types import InputMediaDocument, InlineKeyboardMarkup, WebAppInfo, InlineKeyboardButton, Update
+from fastapi import FastAPI, HTTPException, Header, Depends, Query, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
 
+from src.config.database.db_config import settings_db
+from src.config.database.db_helper import db_helper
 from src.config.project_config import settings
+from src.logger import logger, setup_logging
+from src.metrics import HTTP_REQUEST_DURATION, TelegramMetricsMiddleware, collect_fsm_states, collect_pool_stats, \
+    instrument_engine
 from src.models.chat_model import ChatModel
+from src.redis_client import redis
 from src.s3_client import s3client
 from src.services.admin.bot import admin_bot
-from src.services.admin.middlewares.album_middleware import AlbumMiddleware
-from src.services.admin.middlewares.log_middleware import LogMiddleware
+from src.services.admin.handlers.admin import run_broadcast_job, send_chat_health_report
+from src.services.admin.middlewares.album_middleware import AlbumMiddleware, RedisAlbumMiddleware
+from src.services.admin.middlewares.db_session_middleware import DbSessionMiddleware as AdminDbSessionMiddleware, \
+    UnitOfWorkCheckpointMiddleware as AdminUnitOfWorkCheckpointMiddleware
+from src.services.admin.middlewares.log_middleware import LogMiddleware, HandlerContextMiddleware
+from src.services.admin.schemas.message_schema import MessageSearchPage
+from src.services.admin.services.message_service import MIN_SEARCH_LENGTH, message_service
+from src.services.admin.middlewares.metrics_middleware import MetricsMiddleware as AdminMetricsMiddleware
 from src.services.operator_helper.bot import operator_bot
 from src.services.operator_helper.handlers.operator import LEAD_TEMPLATE
+from src.services.operator_helper.middlewares.db_session_middleware import DbSessionMiddleware as OperatorDbSessionMiddleware, \
+    UnitOfWorkCheckpointMiddleware as OperatorUnitOfWorkCheckpointMiddleware
+from src.services.operator_helper.middlewares.metrics_middleware import MetricsMiddleware as OperatorMetricsMiddleware
 from src.services.operator_helper.services.chat_service import chat_service
+from src.use_cases.broadcast_job_use_case import broadcast_queue
+from src.use_cases.cache_invalidation_use_case import cache_invalidation
+from src.use_cases.chat_health_use_case import ChatHealthSweeper
+from src.use_cases.cluster_use_case import cluster, update_partitions
+from src.use_cases.file_id_cache_use_case import file_id_cache, get_file_id
+from src.use_cases.lead_queue_use_case import LeadSteps, lead_queue
 
 key_builder = DefaultKeyBuilder(with_bot_id=True)
-redis_storage = RedisStorage.from_url(settings.REDIS_URL, key_builder=key_builder)
+redis_storage = RedisStorage(redis=redis, key_builder=key_builder)
 
 app = FastAPI(title="OperatorBot API")
 operator_dp = Dispatcher(storage=redis_storage)
 admins_dp = Dispatcher(storage=redis_storage)
 
 
+@app.middleware("http")
+async def observe_http_request(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_DURATION.labels(
+        request.method, route.path if route else "unmatched", response.status_code
+    ).observe(time.perf_counter() - started)
+    return response
+
+
+@app.get("/metrics")
+async def metrics():
+    await collect_fsm_states(redis)
+    collect_pool_stats(db_helper.pool_snapshot())
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 async def verify_bearer_token(authorization: str | None = Header(None)):
     if authorization is None or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Unauthorized")
@@ -45,19 +86,9 @@ class LeadRequest(BaseModel):
     files: list[str]
 
 
-@app.post("/selectGroup")
-async def send_photo(
-    user_id: int,
-    group_id: str,
-    lead: LeadRequest,
-    token: None = Depends(verify_bearer_token)  # pylint: disable=unused-argument
-):
-    print(user_id, group_id)
-    print(lead)
-
-    chat: ChatModel = await chat_service.get(group_id)
-    chat_name = chat.name
-
+async def deliver_lead(user_id: int, group_id: str, lead: LeadRequest, chat_name: str, steps: LeadSteps | None = None):
+    """Каждая отправка - шаг LeadSteps: при повторной попытке из очереди выполненные шаги пропускаются"""
+    steps = steps or LeadSteps()
     bot = operator_bot.bot
     state: FSMContext = operator_dp.fsm.get_context(
         bot=bot,
@@ -72,91 +103,283 @@ async def send_photo(
     )
 
     if not lead.files:
-        await bot.send_message(user_id, message)
-        await bot.send_message(group_id, message)
+        await steps.run('user', lambda: bot.send_message(user_id, message))
+        await steps.run('group', lambda: bot.send_message(group_id, message))
     else:
-        temp_files = await s3client.download_files(lead.files)
-        try:
-            if (len(temp_files) == 1
-                and temp_files[0].real_name.lower().endswith(('.ogg', '.mp3', '.m4a'))):
-                tmp = temp_files[0]
-                audio = FSInputFile(tmp.path, filename=tmp.real_name)
+        async def send_to_user() -> str:
+            cached = await file_id_cache.get_many(lead.files)
+            if cached is None:
+                files = await s3client.get_input_files(lead.files)
+                filenames = [file.filename for file in files]
+            else:
+                files = [i['file_id'] for i in cached]
+                filenames = [i['filename'] for i in cached]
 
-                await bot.send_voice(
+            voice = len(files) == 1 and filenames[0].lower().endswith(('.ogg', '.mp3', '.m4a'))
+            if voice:
+                sent = await bot.send_voice(
                     chat_id=user_id,
-                    voice=audio,
+                    voice=files[0],
                     caption=message,
                 )
+                file_ids = [get_file_id(sent)]
+            else:
+                media = [InputMediaDocument(media=file) for file in files]
+                media[-1].caption = message
+                sent = await bot.send_media_group(
+                    chat_id=user_id,
+                    media=media,
+                )
+                file_ids = [get_file_id(i) for i in sent]
+            await file_id_cache.set_many(lead.files, file_ids, filenames)
+            # file_id нужны шагу group и при повторной попытке
+            return json.dumps({'file_ids': file_ids, 'voice': voice})
+
+        sent = json.loads(await steps.run('user', send_to_user))
+
+        async def send_to_group():
+            if sent['voice']:
                 await bot.send_voice(
                     chat_id=group_id,
-                    voice=audio,
+                    voice=sent['file_ids'][0],
                     caption=message,
                 )
             else:
-                media = [
-                    InputMediaDocument(media=FSInputFile(tmp.path, filename=tmp.real_name))
-                    for tmp in temp_files
-                ]
+                media = [InputMediaDocument(media=file_id) for file_id in sent['file_ids']]
                 media[-1].caption = message
-                await bot.send_media_group(
-                    chat_id=user_id,
-                    media=media,
-                )
                 await bot.send_media_group(
                     chat_id=group_id,
                     media=media,
                 )
 
-                await s3client.delete_files(lead.files)
-        finally:
-            for tmp in temp_files:
-                try:
-                    if os.path.exists(tmp.path):
-                        os.remove(tmp.path)
-                except OSError:
-                    pass
+        await steps.run('group', send_to_group)
+        if not sent['voice']:
+            await s3client.delete_files(lead.files)
 
     await state.clear()
-    message = await bot.send_message(user_id, "Сообщение отправлено в группу " + chat_name)
-    await message.answer("Выбрать чат для отправки", reply_markup=InlineKeyboardMarkup(
+    await steps.run('notify', lambda: bot.send_message(user_id, "Сообщение отправлено в группу " + chat_name))
+    await steps.run('menu', lambda: bot.send_message(user_id, "Выбрать чат для отправки", reply_markup=InlineKeyboardMarkup(
         row_width=1,
         inline_keyboard=[
             [
                 InlineKeyboardButton(text="Открыть список чатов", web_app=WebAppInfo(url=settings.WEB_APP_URL))
             ]
         ]
-    ))
+    )))
+
+
+async def deliver_queued_lead(payload: dict, steps: LeadSteps):
+    await deliver_lead(
+        user_id=payload['user_id'],
+        group_id=payload['group_id'],
+        lead=LeadRequest(**payload['lead']),
+        chat_name=payload['chat_name'],
+        steps=steps,
+    )
+
+
+@app.post("/selectGroup")
+async def send_photo(
+    user_id: int,
+    group_id: str,
+    lead: LeadRequest,
+    response: Response,
+    token: None = Depends(verify_bearer_token)  # pylint: disable=unused-argument
+):
+    logger.info('selectGroup request', extra={'fields': {'user_id': user_id, 'group_id': group_id}})
+
+    chat: ChatModel = await chat_service.get(group_id)
+    if chat is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    if settings.LEAD_QUEUE_ENABLED:
+        lead_id = await lead_queue.enqueue({
+            'user_id': user_id,
+            'group_id': group_id,
+            'lead': lead.model_dump(),
+            'chat_name': chat.name,
+        })
+        response.status_code = 202
+        return {"status": "accepted", "lead_id": lead_id}
+
+    await deliver_lead(user_id, group_id, lead, chat.name)
     return {"status": "ok"}
 
 
+@app.get("/selectGroup/{lead_id}")
+async def lead_status(
+    lead_id: str,
+    token: None = Depends(verify_bearer_token)  # pylint: disable=unused-argument
+):
+    status = await lead_queue.status(lead_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    return status
+
+
+@app.get("/messages/search", response_model=MessageSearchPage)
+async def search_messages(
+    q: str = Query(min_length=MIN_SEARCH_LENGTH),
+    chat_id: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    token: None = Depends(verify_bearer_token)  # pylint: disable=unused-argument
+):
+    return await message_service.search(q, chat_id=chat_id, limit=limit, offset=offset)
+
+
+WEBHOOKS = [
+    ('operator', '/webhook/operator', operator_dp, operator_bot.bot),
+    ('admin', '/webhook/admin', admins_dp, admin_bot.bot),
+]
+webhook_tasks: set[asyncio.Task] = set()
+
+
+def create_webhook_route(name: str, dp: Dispatcher, bot: Bot):
+    async def webhook(
+        request: Request,
+        x_telegram_bot_api_secret_token: str | None = Header(None),
+    ):
+        if not settings.WEBHOOK_SECRET or x_telegram_bot_api_secret_token != settings.WEBHOOK_SECRET:
+            raise HTTPException(status_code=401, detail="Unauthorized")
+
+        update = Update.model_validate(await request.json(), context={"bot": bot})
+        if settings.CLUSTER_ENABLED:
+            await update_partitions.publish(name, update)
+            return {"ok": True}
+
+        task = asyncio.create_task(dp.feed_update(bot, update))
+        webhook_tasks.add(task)
+        task.add_done_callback(webhook_tasks.discard)
+        return {"ok": True}
+
+    return webhook
+
+
+async def feed_partitioned_update(bot_name: str, update: dict):
+    for name, path, dp, bot in WEBHOOKS:
+        if name == bot_name:
+            await dp.feed_update(bot, Update.model_validate(update, context={"bot": bot}))
+
+
+if settings.BOT_MODE == 'webhook':
+    for webhook_name, webhook_path, webhook_dp, webhook_bot in WEBHOOKS:
+        app.add_api_route(webhook_path, create_webhook_route(webhook_name, webhook_dp, webhook_bot), methods=["POST"])
+
+
 async def run_fastapi():
     config = uvicorn.Config(
-        app, host="0.0.0.0", port=settings.SERVICE_PORT, loop="asyncio", log_level="info"
+        app, host="0.0.0.0", port=settings.SERVICE_PORT, loop="asyncio", log_level="info", log_config=None
     )
     server = uvicorn.Server(config)
     await server.serve()
 
 
-async def start_bots_polling():
-    operator_dp.message.outer_middleware(AlbumMiddleware())
+def create_album_middleware():
+    if settings.ALBUM_BACKEND == 'redis':
+        return RedisAlbumMiddleware(redis)
+    return AlbumMiddleware()
+
+
+async def setup_bots():
+    if settings_db.DB_UNIT_OF_WORK:
+        operator_dp.update.outer_middleware(OperatorDbSessionMiddleware())
+        admins_dp.update.outer_middleware(AdminDbSessionMiddleware())
+        # Админ-бот тоже вызывает operator_bot (leave_chat, delete_message), поэтому middleware на обоих ботах
+        operator_bot.bot.session.middleware(OperatorUnitOfWorkCheckpointMiddleware())
+        admin_bot.bot.session.middleware(AdminUnitOfWorkCheckpointMiddleware())
+
+    operator_dp.message.outer_middleware(create_album_middleware())
     operator_dp.message.outer_middleware(LogMiddleware())
     operator_dp.callback_query.outer_middleware(LogMiddleware())
+    operator_dp.message.middleware(HandlerContextMiddleware())
+    operator_dp.callback_query.middleware(HandlerContextMiddleware())
+    operator_dp.message.middleware(OperatorMetricsMiddleware('operator'))
+    operator_dp.callback_query.middleware(OperatorMetricsMiddleware('operator'))
+    operator_dp.my_chat_member.middleware(OperatorMetricsMiddleware('operator'))
+    operator_bot.bot.session.middleware(TelegramMetricsMiddleware('operator'))
 
-    admins_dp.message.outer_middleware(AlbumMiddleware())
+    admins_dp.message.outer_middleware(create_album_middleware())
     admins_dp.message.outer_middleware(LogMiddleware())
     admins_dp.callback_query.outer_middleware(LogMiddleware())
+    admins_dp.message.middleware(HandlerContextMiddleware())
+    admins_dp.callback_query.middleware(HandlerContextMiddleware())
+    admins_dp.message.middleware(AdminMetricsMiddleware('admin'))
+    admins_dp.callback_query.middleware(AdminMetricsMiddleware('admin'))
+    admin_bot.bot.session.middleware(TelegramMetricsMiddleware('admin'))
+
+    instrument_engine(db_helper.engine)
 
     await admin_bot.start_bot(admins_dp)
     await operator_bot.start_bot(operator_dp)
+    await s3client.start()
+
+    loop = asyncio.get_running_loop()
+    consume_broadcasts = lambda: broadcast_queue.consume(lambda job: run_broadcast_job(job, admin_bot.bot))
+    sweeper = ChatHealthSweeper(operator_bot.bot, chat_service)
+    sweep_chats = lambda: sweeper.run(lambda report: send_chat_health_report(report, admin_bot.bot))
+    if settings.CLUSTER_ENABLED:
+        loop.create_task(cluster.heartbeat())
+        loop.create_task(cache_invalidation.listen())
+        loop.create_task(cluster.run_exclusive('broadcast', consume_broadcasts))
+        if settings.CHAT_SWEEP_INTERVAL > 0:
+            loop.create_task(cluster.run_exclusive('chat_sweeper', sweep_chats))
+    else:
+        loop.create_task(consume_broadcasts())
+        if settings.CHAT_SWEEP_INTERVAL > 0:
+            loop.create_task(sweep_chats())
+    if settings.LEAD_QUEUE_ENABLED:
+        loop.create_task(lead_queue.consume(deliver_queued_lead, workers=settings.LEAD_WORKERS))
+
+
+async def start_bots_polling():
+    await setup_bots()
 
     loop = asyncio.get_running_loop()
     loop.create_task(run_fastapi())
 
-    await asyncio.gather(
-        operator_dp.start_polling(operator_bot.bot),
-        admins_dp.start_polling(admin_bot.bot),
-    )
+    try:
+        if settings.CLUSTER_ENABLED:
+            await cluster.run_exclusive('poller', lambda: asyncio.gather(
+                operator_dp.start_polling(operator_bot.bot, handle_signals=False, close_bot_session=False),
+                admins_dp.start_polling(admin_bot.bot, handle_signals=False, close_bot_session=False),
+            ))
+        else:
+            await asyncio.gather(
+                operator_dp.start_polling(operator_bot.bot),
+                admins_dp.start_polling(admin_bot.bot),
+            )
+    finally:
+        await s3client.close()
+
+
+async def start_bots_webhook():
+    await setup_bots()
+
+    for name, path, dp, bot in WEBHOOKS:
+        await bot.set_webhook(
+            url=settings.WEBHOOK_URL.rstrip('/') + path,
+            secret_token=settings.WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=False,
+        )
+        await dp.emit_startup(bot=bot, dispatcher=dp, bots=[bot], **dp.workflow_data)
+
+    if settings.CLUSTER_ENABLED:
+        asyncio.get_running_loop().create_task(update_partitions.run(feed_partitioned_update))
+
+    try:
+        await run_fastapi()
+    finally:
+        for name, path, dp, bot in WEBHOOKS:
+            await dp.emit_shutdown(bot=bot, dispatcher=dp, bots=[bot], **dp.workflow_data)
+            await bot.session.close()
+        await s3client.close()
 
 
 if __name__ == '__main__':
-    asyncio.run(start_bots_polling())
+    setup_logging()
+    if settings.BOT_MODE == 'webhook':
+        asyncio.run(start_bots_webhook())
+    else:
+        asyncio.run(start_bots_polling())
@@ -0,0 +1,23 @@
+import os
+
+# Настройки читаются при импорте src: тестам достаточно любых значений
+for name, value in {
+    'ADMIN_TOKEN': '123:abc',
+    'OPERATOR_TOKEN': '124:abc',
+    'ADMINS': '1',
+    'ADMINS_1': '1',
+    'SERVICE_PORT': '8000',
+    'SERVICE_TOKEN': 'token',
+    'WEB_APP_URL': 'https://example.com',
+    'REDIS_URL': 'redis://localhost:6379',
+    'S3_ACCESS_KEY_ID': 'key',
+    'S3_SECRET_ACCESS_KEY': 'secret',
+    'S3_BUCKET_NAME': 'bucket',
+    'S3_ENDPOINT_URL': 'http://localhost:9000',
+    'POSTGRES_USER': 'user',
+    'POSTGRES_PASSWORD': 'password',
+    'POSTGRES_HOST': 'localhost',
+    'POSTGRES_PORT': '5432',
+    'POSTGRES_DB': 'db',
+}.items():
+    os.environ.setdefault(name, value)
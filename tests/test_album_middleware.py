@@ -0,0 +1,149 @@
+import asyncio
+from datetime import datetime
+
+import fakeredis
+import pytest
+from aiogram.types import Chat, Message
+
+from src.services.admin.middlewares import album_middleware as admin_album_middleware
+from src.services.operator_helper.middlewares import album_middleware as operator_album_middleware
+
+LATENCY = 0.2
+MAX_LATENCY = 0.6
+
+modules = pytest.mark.parametrize('module', [admin_album_middleware, operator_album_middleware],
+                                  ids=['admin', 'operator_helper'])
+
+
+def make_message(message_id: int, media_group_id: str | None = 'album') -> Message:
+    return Message(message_id=message_id, date=datetime.now(), chat=Chat(id=1, type='private'),
+                   media_group_id=media_group_id)
+
+
+class Handler:
+    def __init__(self, error: Exception | None = None):
+        self.calls = []
+        self.error = error
+
+    async def __call__(self, message: Message, data: dict):
+        loop = asyncio.get_running_loop()
+        self.calls.append((loop.time(), [m.message_id for m in data.get('album', [message])]))
+        if self.error is not None:
+            raise self.error
+
+
+async def send_parts(middleware, handler: Handler, count: int, interval: float = 0.01,
+                     media_group_id: str = 'album'):
+    """Отправляет части альбома с интервалом, возвращает время последней части и результаты вызовов"""
+    loop = asyncio.get_running_loop()
+    tasks = []
+    for message_id in range(count, 0, -1):
+        tasks.append(asyncio.create_task(middleware(handler, make_message(message_id, media_group_id), {})))
+        await asyncio.sleep(interval)
+    last_at = loop.time() - interval
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return last_at, results
+
+
+@modules
+@pytest.mark.parametrize('count', range(2, 11))
+def test_album_is_collected_in_order(module, count):
+    async def scenario():
+        middleware = module.AlbumMiddleware(latency=LATENCY, max_latency=MAX_LATENCY)
+        handler = Handler()
+        last_at, _ = await send_parts(middleware, handler, count)
+        return middleware, handler, last_at
+
+    middleware, handler, last_at = asyncio.run(scenario())
+
+    assert len(handler.calls) == 1
+    called_at, album = handler.calls[0]
+    assert album == list(range(1, count + 1))
+    if count < module.MAX_ALBUM_SIZE:
+        # Полный альбом отдается после паузы latency с последней части
+        assert LATENCY * 0.9 <= called_at - last_at < LATENCY + 0.1
+    else:
+        # 10-я часть завершает альбом без ожидания
+        assert called_at - last_at < LATENCY / 2
+    assert middleware.album_data == {}
+
+
+@modules
+def test_album_is_completed_by_max_latency(module):
+    async def scenario():
+        middleware = module.AlbumMiddleware(latency=LATENCY, max_latency=MAX_LATENCY)
+        handler = Handler()
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        # Части приходят чаще latency: без предела альбом ждал бы все 9 частей
+        await send_parts(middleware, handler, 9, interval=LATENCY / 2)
+        return handler, started_at
+
+    handler, started_at = asyncio.run(scenario())
+
+    called_at, album = handler.calls[0]
+    assert MAX_LATENCY * 0.9 <= called_at - started_at < MAX_LATENCY + 0.1
+    assert len(album) < 9
+
+
+@modules
+def test_message_without_media_group_is_passed_through(module):
+    async def scenario():
+        handler = Handler()
+        await module.AlbumMiddleware(latency=LATENCY)(handler, make_message(1, media_group_id=None), {})
+        return handler
+
+    handler = asyncio.run(scenario())
+
+    assert [album for _, album in handler.calls] == [[1]]
+
+
+@modules
+def test_album_is_cleaned_up_when_handler_raises(module):
+    async def scenario():
+        middleware = module.AlbumMiddleware(latency=LATENCY, max_latency=MAX_LATENCY)
+        _, results = await send_parts(middleware, Handler(error=ValueError('boom')), 3)
+        assert middleware.album_data == {}
+
+        # Альбом с тем же media_group_id собирается заново
+        handler = Handler()
+        await send_parts(middleware, handler, 2)
+        return results, handler
+
+    results, handler = asyncio.run(scenario())
+
+    assert sum(isinstance(result, ValueError) for result in results) == 1
+    assert [album for _, album in handler.calls] == [[1, 2]]
+
+
+@modules
+def test_album_is_cleaned_up_when_cancelled(module):
+    async def scenario():
+        middleware = module.AlbumMiddleware(latency=LATENCY, max_latency=MAX_LATENCY)
+        task = asyncio.create_task(middleware(Handler(), make_message(1), {}))
+        await asyncio.sleep(LATENCY / 4)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return middleware
+
+    assert asyncio.run(scenario()).album_data == {}
+
+
+@modules
+@pytest.mark.parametrize('count', [2, 10])
+def test_redis_album_is_handled_once(module, count):
+    async def scenario():
+        middleware = module.RedisAlbumMiddleware(fakeredis.FakeAsyncRedis(), latency=LATENCY,
+                                                 max_latency=MAX_LATENCY)
+        handler = Handler()
+        last_at, _ = await send_parts(middleware, handler, count)
+        return handler, last_at, await middleware.redis.keys('album:*')
+
+    handler, last_at, keys = asyncio.run(scenario())
+
+    assert len(handler.calls) == 1
+    called_at, album = handler.calls[0]
+    assert album == list(range(1, count + 1))
+    if count == module.MAX_ALBUM_SIZE:
+        assert called_at - last_at < LATENCY / 2
+    assert keys == []
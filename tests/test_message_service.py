@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.services.operator_helper.models.chat_model import ChatModel
+from src.services.operator_helper.models.message_model import MessageModel
+from src.services.operator_helper.repositories.message_repository import MessageRepository
+from src.services.operator_helper.schemas.message_schema import MessageCreate
+from src.services.operator_helper.services.message_service import MessageService
+
+
+@pytest.fixture
+def engine():
+    engine = create_async_engine('sqlite+aiosqlite://')
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(MessageModel.metadata.create_all, tables=[ChatModel.__table__, MessageModel.__table__])
+
+    asyncio.run(create_tables())
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    return executed
+
+
+@pytest.fixture
+def service(engine):
+    return MessageService(repository=MessageRepository(model=MessageModel, db_session=async_sessionmaker(engine)))
+
+
+async def stored(engine):
+    async with async_sessionmaker(engine)() as session:
+        rows = await session.execute(select(MessageModel.id, MessageModel.chat_id, MessageModel.phone))
+        return sorted(rows.all())
+
+
+def test_create_many_is_one_insert(engine, statements, service):
+    messages = [MessageCreate(id='1', chat_id='-100', phone=phone, message='lead')
+                for phone in ('9001112233', '9004445566', '9007778899')]
+
+    asyncio.run(service.create_many(messages))
+
+    assert len(statements) == 1
+    assert statements[0].startswith('INSERT')
+    assert len(asyncio.run(stored(engine))) == 3
+
+
+def test_create_many_empty_does_not_query(statements, service):
+    asyncio.run(service.create_many([]))
+
+    assert statements == []
+
+
+def test_same_message_id_and_phone_in_other_chat_is_kept(engine, service):
+    asyncio.run(service.create_many([MessageCreate(id='7', chat_id='-100', phone='9001112233', message='a')]))
+    asyncio.run(service.create_many([MessageCreate(id='7', chat_id='-200', phone='9001112233', message='b')]))
+    asyncio.run(service.create_many([MessageCreate(id='7', chat_id='-200', phone='9001112233', message='c')]))
+
+    assert asyncio.run(stored(engine)) == [('7', '-100', '9001112233'), ('7', '-200', '9001112233')]
@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime
+
+import fakeredis
+import pytest
+from aiogram.types import Chat, Message, Update
+
+from src.use_cases.cluster_use_case import Cluster, UpdatePartitions
+
+
+def make_update(update_id: int, chat_id: int, media_group_id: str | None = None) -> Update:
+    return Update(update_id=update_id, message=Message(
+        message_id=update_id, date=datetime.now(), chat=Chat(id=chat_id, type='private'),
+        media_group_id=media_group_id,
+    ))
+
+
+@pytest.fixture
+def partitions():
+    redis = fakeredis.FakeAsyncRedis()
+    blmove = redis.blmove
+
+    async def blocking_blmove(*args, **kwargs):
+        # fakeredis не блокируется при timeout=0
+        item = await blmove(*args, **kwargs)
+        if item is None:
+            await asyncio.sleep(0.01)
+        return item
+
+    redis.blmove = blocking_blmove
+    return UpdatePartitions(Cluster(redis, replica_id='replica', ttl=10), partitions=1)
+
+
+async def consume(partitions: UpdatePartitions, updates: list[Update], delay: float = 0.05) -> list:
+    """Обрабатывает обновления, возвращает события (start|end, update_id)"""
+    events = []
+
+    async def handle(bot: str, update: dict):
+        events.append(('start', update['update_id']))
+        await asyncio.sleep(delay)
+        events.append(('end', update['update_id']))
+
+    for update in updates:
+        await partitions.publish('operator', update)
+    task = asyncio.create_task(partitions._consume(0, handle))
+    while len(events) < 2 * len(updates):
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert await partitions.cluster.redis.llen(partitions.processing_key(0)) == 0
+    return events
+
+
+def test_updates_of_one_chat_are_serialized(partitions):
+    events = asyncio.run(consume(partitions, [make_update(i, chat_id=1) for i in range(1, 4)]))
+
+    assert events == [('start', 1), ('end', 1), ('start', 2), ('end', 2), ('start', 3), ('end', 3)]
+
+
+def test_chats_are_handled_concurrently(partitions):
+    events = asyncio.run(consume(partitions, [make_update(1, chat_id=1), make_update(2, chat_id=2)]))
+
+    assert events[:2] == [('start', 1), ('start', 2)]
+
+
+def test_album_parts_are_handled_concurrently_in_chat_order(partitions):
+    events = asyncio.run(consume(partitions, [
+        make_update(1, chat_id=1),
+        make_update(2, chat_id=1, media_group_id='album'),
+        make_update(3, chat_id=1, media_group_id='album'),
+        make_update(4, chat_id=1),
+    ]))
+
+    # Части альбома ждут предыдущее сообщение, следующее сообщение ждет весь альбом
+    assert events[:2] == [('start', 1), ('end', 1)]
+    assert set(events[2:4]) == {('start', 2), ('start', 3)}
+    assert set(events[4:6]) == {('end', 2), ('end', 3)}
+    assert events[6:] == [('start', 4), ('end', 4)]
+
+
+def test_handler_error_does_not_block_chat(partitions):
+    async def scenario():
+        handled = []
+
+        async def handle(bot: str, update: dict):
+            handled.append(update['update_id'])
+            if update['update_id'] == 1:
+                raise ValueError('boom')
+
+        for update in (make_update(1, chat_id=1), make_update(2, chat_id=1)):
+            await partitions.publish('operator', update)
+        task = asyncio.create_task(partitions._consume(0, handle))
+        while len(handled) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return handled
+
+    assert asyncio.run(scenario()) == [1, 2]